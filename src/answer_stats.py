@@ -0,0 +1,190 @@
+"""
+Incrementally maintained aggregates for the strategy/model leaderboards.
+Every write that adds a metric value (new answers, BERTScore results,
+feedback, best-answer votes) also adds it to the running count, sum and sum
+of squares of its (model, strategy, category) group in answer_stats, so
+/api/stats only reads that small table instead of joining all answers.
+"""
+import math
+
+from sqlalchemy import String, case, delete, func, insert, literal, select, type_coerce
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from db_models import Answer, AnswerStat, Feedback, Metaprompt, Model, Query, Question, QuestionCategory, Strategy
+
+GROUP_FIELDS = ['model', 'strategy', 'category']
+Z_95 = 1.96  # Normal quantile for 95% confidence intervals
+
+# Metric name -> SQL expression over the joined answer row (NULL = no value yet)
+METRICS = {
+    'f1': Answer.f1,
+    'completeness': Feedback.completeness,
+    'relevance': Feedback.relevance,
+    'clarity': Feedback.clarity,
+    # Share of judged queries in which the answer was picked as the best one
+    'best_answer': case(
+        (Query.best_answer_id.is_(None), None),
+        (Query.best_answer_id == Answer.id, 1.0),
+        else_=0.0
+    ),
+    'answer_tokens': Answer.total_tokens,
+    'metaprompt_tokens': Metaprompt.total_tokens,
+    'response_time': Answer.response_time,
+}
+
+# Metrics known when an answer is inserted
+INSERT_METRICS = ['answer_tokens', 'metaprompt_tokens', 'response_time']
+FEEDBACK_METRICS = ['completeness', 'relevance', 'clarity']
+
+
+def _group_columns():
+    return [
+        Model.name.label('model'),
+        func.coalesce(Strategy.name, 'none').label('strategy'),
+        type_coerce(Question.category, String).label('category'),
+    ]
+
+
+def _category_label(name):
+    """Display name of a category as stored in the database (enum name)"""
+    return QuestionCategory[name].value if name in QuestionCategory.__members__ else name
+
+
+def _category_name(label):
+    for category in QuestionCategory:
+        if label in (category.value, category.name):
+            return category.name
+    return label
+
+
+def _join_answers(statement):
+    return (
+        statement.select_from(Answer)
+        .join(Model, Answer.model == Model.id)
+        .join(Query, Answer.query_id == Query.id)
+        .join(Question, Query.question_id == Question.id)
+        .outerjoin(Metaprompt, Metaprompt.answer_id == Answer.id)
+        .outerjoin(Strategy, Metaprompt.strategy_id == Strategy.id)
+        .outerjoin(Feedback, Answer.feedback_id == Feedback.id)
+    )
+
+
+def record_metrics(session, answer_ids, metrics):
+    """
+    Add the current values of `metrics` for the given answers to their groups.
+    Call it in the transaction that wrote the values, once per value.
+
+    Args:
+        session: Session bound to the write engine (not committed here)
+        answer_ids: Ids of the answers whose values were just written
+        metrics: Metric names from METRICS
+    """
+    answer_ids = list(answer_ids)
+    if not answer_ids or not metrics:
+        return
+
+    statement = _join_answers(select(*_group_columns(), *(METRICS[m].label(m) for m in metrics)))
+    sums = {}  # (model, strategy, category, metric) -> [n, total, total_sq]
+    for row in session.execute(statement.where(Answer.id.in_(answer_ids))):
+        for metric in metrics:
+            value = getattr(row, metric)
+            if value is None:
+                continue
+            entry = sums.setdefault((row.model, row.strategy, row.category, metric), [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += value
+            entry[2] += value * value
+    if not sums:
+        return
+
+    upsert = sqlite_insert(AnswerStat).values([
+        {'model': model, 'strategy': strategy, 'category': category, 'metric': metric,
+         'n': n, 'total': total, 'total_sq': total_sq}
+        for (model, strategy, category, metric), (n, total, total_sq) in sums.items()
+    ])
+    session.execute(upsert.on_conflict_do_update(
+        index_elements=[AnswerStat.model, AnswerStat.strategy, AnswerStat.category, AnswerStat.metric],
+        set_={
+            'n': AnswerStat.n + upsert.excluded.n,
+            'total': AnswerStat.total + upsert.excluded.total,
+            'total_sq': AnswerStat.total_sq + upsert.excluded.total_sq,
+        }
+    ))
+
+
+def rebuild(connection):
+    """Recompute answer_stats from the answers table (one GROUP BY per metric)"""
+    connection.execute(delete(AnswerStat))
+    for metric, value in METRICS.items():
+        groups = _group_columns()
+        connection.execute(insert(AnswerStat).from_select(
+            ['model', 'strategy', 'category', 'metric', 'n', 'total', 'total_sq'],
+            _join_answers(select(
+                *groups,
+                literal(metric),
+                func.count(value),
+                func.sum(value),
+                func.sum(value * value),
+            )).where(value.is_not(None)).group_by(*groups)
+        ))
+
+
+def summarize(n, total, total_sq):
+    """
+    Mean and normal-approximation 95% confidence interval of a group.
+
+    Returns:
+        dict: {n, mean, std, ci_low, ci_high}; std and the interval are None below two values
+    """
+    mean = total / n if n else None
+    std = ci_low = ci_high = None
+    if n > 1:
+        # Sample variance from the running sums, clamped against rounding errors
+        std = math.sqrt(max(0.0, (total_sq - n * mean * mean) / (n - 1)))
+        margin = Z_95 * std / math.sqrt(n)
+        ci_low, ci_high = mean - margin, mean + margin
+    return {'n': n, 'mean': mean, 'std': std, 'ci_low': ci_low, 'ci_high': ci_high}
+
+
+def leaderboard(session, group_by=GROUP_FIELDS, metrics=None, filters=None):
+    """
+    Aggregated metrics, rolled up to the requested grouping.
+
+    Args:
+        session: Read session
+        group_by: Subset of GROUP_FIELDS to group by (empty = one overall group)
+        metrics: Metric names to include (default: all)
+        filters: Optional {field: value} restricting model, strategy or category
+            (categories by display name, e.g. 'Confusion: Places')
+
+    Returns:
+        list: [{<group fields>, 'metrics': {metric: summarize(...)}}], sorted by group
+    """
+    statement = select(AnswerStat.model, AnswerStat.strategy, AnswerStat.category, AnswerStat.metric,
+                       AnswerStat.n, AnswerStat.total, AnswerStat.total_sq)
+    if metrics:
+        statement = statement.where(AnswerStat.metric.in_(metrics))
+    for field, value in (filters or {}).items():
+        if field == 'category':
+            value = _category_name(value)
+        statement = statement.where(getattr(AnswerStat, field) == value)
+
+    # Sums of disjoint groups add up, so coarser groupings need no extra query
+    groups = {}
+    for stat in session.execute(statement):
+        key = tuple(
+            _category_label(stat.category) if field == 'category' else getattr(stat, field)
+            for field in group_by
+        )
+        sums = groups.setdefault(key, {}).setdefault(stat.metric, [0, 0.0, 0.0])
+        sums[0] += stat.n
+        sums[1] += stat.total
+        sums[2] += stat.total_sq
+
+    return [
+        {
+            **dict(zip(group_by, key)),
+            'metrics': {metric: summarize(*sums) for metric, sums in sorted(group.items())},
+        }
+        for key, group in sorted(groups.items())
+    ]
@@ -0,0 +1,125 @@
+"""
+Batch write latency of the per-row insert loop against the bulk write path.
+Each batch inserts answers with metaprompts and one feedback entry per answer.
+Run from the src directory:
+    python -m benchmarks.bulk_insert [batch sizes ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+import migrations
+from bulk_writes import insert_answers, insert_feedback_entries
+from database import create_engines
+from db_models import Base, User, Model, Strategy, Question, Query, Answer, Feedback, Metaprompt
+from lookups import LookupRegistry
+
+DEFAULT_SIZES = [1, 6, 50, 500]
+REPEATS = 20
+MODELS = [f'model{i}' for i in range(6)]
+
+
+def build_database(path):
+    engine, read_engine = create_engines(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    migrations.upgrade(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([Model(name=name) for name in MODELS])
+    session.add_all([Strategy(name='cot'), User(user='annotator')])
+    session.add(Question(type='ADVERSARIAL', category='HEALTH', question='Q?', correct_answer='A'))
+    session.commit()
+    session.close()
+    return engine, read_engine
+
+
+def make_answers(query_id, size):
+    return [{
+        'answer': 'x' * 500, 'model': MODELS[i % len(MODELS)], 'user': 'annotator', 'strategy': 'cot',
+        'query_id': query_id, 'position': i,
+        'tokens': {'prompt_eval_count': 10, 'eval_count': 100, 'total_tokens': 110},
+        'metaprompt_data': {'strategy_name': 'cot', 'metaPrompt': 'prompt', 'prompt_model': MODELS[0]},
+    } for i in range(size)]
+
+
+def per_row_write(session, answers):
+    """The previous write path: lookups and a flush for every row"""
+    answer_ids = []
+    for answer_data in answers:
+        query = session.query(Query).filter_by(id=answer_data['query_id'], user=answer_data['user']).first()
+        model = session.query(Model).filter_by(name=answer_data['model']).first()
+        session.query(Question).filter_by(id=query.question_id).first()
+        answer = Answer(answer=answer_data['answer'], model=model.id, query_id=query.id,
+                        position=answer_data['position'], **answer_data['tokens'])
+        session.add(answer)
+        session.flush()
+        metaprompt_data = answer_data['metaprompt_data']
+        strategy = session.query(Strategy).filter_by(name=metaprompt_data['strategy_name']).first()
+        prompt_model = session.query(Model).filter_by(name=metaprompt_data['prompt_model']).first()
+        session.add(Metaprompt(query_id=query.id, strategy_id=strategy.id, model_id=prompt_model.id,
+                               prompt=metaprompt_data['metaPrompt'], answer_id=answer.id))
+        session.flush()
+        answer_ids.append(answer.id)
+
+    for answer_id in answer_ids:
+        session.query(User).filter_by(user='annotator').first()
+        answer = session.query(Answer).filter_by(id=answer_id).first()
+        feedback = Feedback(user='annotator', completeness=1.0, relevance=2.0, clarity=3.0)
+        session.add(feedback)
+        session.flush()
+        answer.feedback_id = feedback.id
+
+
+def bulk_write(session, answers, lookups):
+    results, _ = insert_answers(session, lookups, answers)
+    insert_feedback_entries(session, [
+        {'answer_id': result['answer_id'], 'user': 'annotator', 'completeness': 1, 'relevance': 2, 'clarity': 3}
+        for result in results
+    ])
+
+
+def time_batches(engine, size, write):
+    Session = sessionmaker(bind=engine)
+    statements = [0]
+    listener = lambda *args: statements.__setitem__(0, statements[0] + 1)
+    event.listen(engine, 'before_cursor_execute', listener)
+
+    elapsed = 0.0
+    for _ in range(REPEATS):
+        session = Session()
+        query = Query(user='annotator', question_id=1)
+        session.add(query)
+        session.commit()
+        answers = make_answers(query.id, size)
+        statements[0] = 0
+
+        start = time.perf_counter()
+        write(session, answers)
+        session.commit()
+        elapsed += time.perf_counter() - start
+        session.close()
+
+    event.remove(engine, 'before_cursor_execute', listener)
+    return elapsed / REPEATS * 1000, statements[0]
+
+
+def main(sizes):
+    print(f"{'batch':>6}{'per-row ms':>14}{'bulk ms':>12}{'speedup':>10}{'stmts per-row':>16}{'stmts bulk':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, read_engine = build_database(os.path.join(tmp, 'bench.db'))
+        lookups = LookupRegistry(sessionmaker(bind=read_engine))
+        lookups.load()
+        for size in sizes:
+            row_ms, row_statements = time_batches(engine, size, per_row_write)
+            bulk_ms, bulk_statements = time_batches(engine, size, lambda s, a: bulk_write(s, a, lookups))
+            print(f"{size:>6}{row_ms:>14.2f}{bulk_ms:>12.2f}{row_ms / bulk_ms:>9.1f}x"
+                  f"{row_statements:>16}{bulk_statements:>12}")
+        engine.dispose()
+        read_engine.dispose()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,59 @@
+"""
+Size and pandas load time of the answer export as JSON rows (what
+/api/custom_query returns) against the Parquet and Arrow IPC exports.
+Run from the src directory:
+    python -m benchmarks.export_formats [answer counts ...]
+"""
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import pyarrow as pa
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.stats_query import build_database
+from data_export import iter_record_batches, stream_export
+
+DEFAULT_SIZES = [10000, 100000]
+
+
+def time_s(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main(sizes):
+    print(f"{'answers':>8}{'format':>9}{'MB':>8}{'export s':>10}{'load s':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            engine, read_engine = build_database(os.path.join(tmp, f'export_{size}.db'), size)
+            session = sessionmaker(bind=read_engine)()
+
+            def json_export():
+                rows = [row for batch in iter_record_batches(session) for row in batch.to_pylist()]
+                return json.dumps(rows, default=str).encode()
+
+            exports = {
+                'json': (json_export, lambda data: pd.DataFrame(json.loads(data))),
+                'parquet': (lambda: b''.join(stream_export(session, 'parquet')),
+                            lambda data: pd.read_parquet(io.BytesIO(data))),
+                'arrow': (lambda: b''.join(stream_export(session, 'arrow')),
+                          lambda data: pa.ipc.open_stream(data).read_pandas()),
+            }
+            for name, (export, load) in exports.items():
+                data, export_s = time_s(export)
+                _, load_s = time_s(lambda: load(data))
+                print(f"{size:>8}{name:>9}{len(data) / 1024**2:>8.1f}{export_s:>10.2f}{load_s:>9.3f}")
+
+            session.close()
+            engine.dispose()
+            read_engine.dispose()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
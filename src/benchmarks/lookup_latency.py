@@ -0,0 +1,95 @@
+"""
+Lookup latency against table size, with and without the lookup indexes.
+Run from the src directory:
+    python -m benchmarks.lookup_latency [sizes ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import migrations
+from db_models import Base, User, Model, Strategy, Question, Query, Answer, Metaprompt
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+REPEATS = 200
+
+LOOKUP_INDEXES = [
+    'ux_questions_question', 'ux_models_name', 'ux_strategies_name',
+    'ix_answers_query_id', 'ix_metaprompts_answer_id', 'ix_queries_user'
+]
+
+
+def build_database(path, size, indexed):
+    """Create a database with `size` rows in each hot table"""
+    engine = create_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    migrations.upgrade(engine)
+    if not indexed:
+        with engine.begin() as connection:
+            for name in LOOKUP_INDEXES:
+                connection.execute(text(f'DROP INDEX IF EXISTS {name}'))
+
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert(), [{'user': f'user{i}'} for i in range(size)])
+        connection.execute(Model.__table__.insert(), [{'name': f'model{i}'} for i in range(size)])
+        connection.execute(Strategy.__table__.insert(), [{'name': f'strategy{i}'} for i in range(size)])
+        connection.execute(Question.__table__.insert(), [
+            {'type': 'ADVERSARIAL', 'category': 'HEALTH', 'question': f'Question number {i}?', 'correct_answer': 'x'}
+            for i in range(size)
+        ])
+        connection.execute(Query.__table__.insert(), [
+            {'user': f'user{i % 100}', 'question_id': i % size + 1} for i in range(size)
+        ])
+        connection.execute(Answer.__table__.insert(), [
+            {'answer': 'answer', 'model': 1, 'query_id': i % size + 1} for i in range(size)
+        ])
+        connection.execute(Metaprompt.__table__.insert(), [
+            {'prompt': 'prompt', 'query_id': i % size + 1, 'answer_id': i + 1} for i in range(size)
+        ])
+    return engine
+
+
+def time_lookup(session, lookup, size):
+    # Keys are spread over the whole table, so unindexed lookups can't stop early
+    keys = [(i * 7919) % size for i in range(REPEATS)]
+    start = time.perf_counter()
+    for key in keys:
+        lookup(session, key)
+    return (time.perf_counter() - start) / REPEATS * 1e6  # microseconds
+
+
+def run(sizes):
+    lookups = {
+        'Question.question': lambda s, i: s.query(Question).filter_by(question=f'Question number {i}?').first(),
+        'Model.name': lambda s, i: s.query(Model).filter_by(name=f'model{i}').first(),
+        'Strategy.name': lambda s, i: s.query(Strategy).filter_by(name=f'strategy{i}').first(),
+        'Answer.query_id': lambda s, i: s.query(Answer).filter_by(query_id=i + 1).all(),
+        'Metaprompt.answer_id': lambda s, i: s.query(Metaprompt).filter_by(answer_id=i + 1).first(),
+        'Query.user': lambda s, i: s.query(Query.id).filter_by(user=f'user{i % 100}').all(),
+    }
+
+    print(f"{'lookup':<22}{'rows':>10}{'no index (us)':>16}{'indexed (us)':>16}{'speedup':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            results = {}
+            for indexed in (False, True):
+                path = os.path.join(tmp, f'bench_{size}_{indexed}.db')
+                engine = build_database(path, size, indexed)
+                session = sessionmaker(bind=engine)()
+                try:
+                    results[indexed] = {name: time_lookup(session, lookup, size) for name, lookup in lookups.items()}
+                finally:
+                    session.close()
+                    engine.dispose()
+
+            for name in lookups:
+                plain, indexed = results[False][name], results[True][name]
+                print(f"{name:<22}{size:>10}{plain:>16.1f}{indexed:>16.1f}{plain / indexed:>9.1f}x")
+
+
+if __name__ == '__main__':
+    run([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,105 @@
+"""
+Leaderboard latency: GROUP BY over the joined answer tables against the
+pre-aggregated answer_stats table behind /api/stats.
+Run from the src directory:
+    python -m benchmarks.stats_query [answer counts ...]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+import answer_stats
+import migrations
+from answer_stats import METRICS, leaderboard
+from database import create_engines
+from db_models import Answer, Base, Feedback, Metaprompt, Model, Query, Question, QuestionCategory, Strategy, User
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+REPEATS = 5
+MODELS = [f'model{i}' for i in range(6)]
+STRATEGIES = ['none', 'S-Template', 'A-Template', 'auto-PE', 'Rephrasing', 'L-Reference', 'C-Reference']
+ANSWERS_PER_QUERY = 6
+
+
+def build_database(path, size):
+    engine, read_engine = create_engines(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    migrations.upgrade(engine)
+    rng = random.Random(0)
+    categories = [category.name for category in QuestionCategory]
+
+    with engine.begin() as connection:
+        connection.execute(Model.__table__.insert(), [{'id': i + 1, 'name': name} for i, name in enumerate(MODELS)])
+        connection.execute(Strategy.__table__.insert(), [{'id': i + 1, 'name': name} for i, name in enumerate(STRATEGIES)])
+        connection.execute(User.__table__.insert(), [{'user': 'annotator'}])
+        connection.execute(Question.__table__.insert(), [
+            {'id': i + 1, 'type': 'ADVERSARIAL', 'category': category, 'question': f'Q{i}?', 'correct_answer': 'A'}
+            for i, category in enumerate(categories)
+        ])
+
+        queries = size // ANSWERS_PER_QUERY
+        connection.execute(Query.__table__.insert(), [
+            {'id': q + 1, 'user': 'annotator', 'question_id': rng.randint(1, len(categories)),
+             'best_answer_id': q * ANSWERS_PER_QUERY + rng.randint(1, ANSWERS_PER_QUERY)}
+            for q in range(queries)
+        ])
+        connection.execute(Feedback.__table__.insert(), [
+            {'id': a + 1, 'user': 'annotator', 'completeness': rng.random(), 'relevance': rng.random(), 'clarity': rng.random()}
+            for a in range(queries * ANSWERS_PER_QUERY)
+        ])
+        connection.execute(Answer.__table__.insert(), [
+            {'id': a + 1, 'answer': 'x' * 200, 'model': rng.randint(1, len(MODELS)), 'query_id': a // ANSWERS_PER_QUERY + 1,
+             'feedback_id': a + 1, 'f1': rng.random(), 'response_time': rng.random() * 10, 'total_tokens': rng.randint(10, 500)}
+            for a in range(queries * ANSWERS_PER_QUERY)
+        ])
+        connection.execute(Metaprompt.__table__.insert(), [
+            {'answer_id': a + 1, 'query_id': a // ANSWERS_PER_QUERY + 1, 'strategy_id': strategy, 'model_id': 1,
+             'prompt': 'meta', 'total_tokens': rng.randint(10, 300)}
+            for a in range(queries * ANSWERS_PER_QUERY)
+            for strategy in [rng.randint(1, len(STRATEGIES))] if strategy > 1
+        ])
+        answer_stats.rebuild(connection)
+    return engine, read_engine
+
+
+def join_query(session):
+    """What the leaderboard costs as ad-hoc SQL: one GROUP BY per metric over the joined tables"""
+    groups = answer_stats._group_columns()
+    return [
+        session.execute(answer_stats._join_answers(select(
+            *groups, func.count(value), func.avg(value)
+        )).where(value.is_not(None)).group_by(*groups)).all()
+        for value in METRICS.values()
+    ]
+
+
+def time_ms(function):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        function()
+    return (time.perf_counter() - start) / REPEATS * 1000
+
+
+def main(sizes):
+    print(f"{'answers':>8}{'join ms':>12}{'stats ms':>12}{'speedup':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            engine, read_engine = build_database(os.path.join(tmp, f'stats_{size}.db'), size)
+            session = sessionmaker(bind=read_engine)()
+
+            join_ms = time_ms(lambda: join_query(session))
+            stats_ms = time_ms(lambda: leaderboard(session))
+            print(f"{size:>8}{join_ms:>12.2f}{stats_ms:>12.2f}{join_ms / stats_ms:>9.0f}x")
+
+            session.close()
+            engine.dispose()
+            read_engine.dispose()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,65 @@
+"""
+User autocompletion latency: ILIKE '%filter%' scan against the in-memory index.
+Run from the src directory:
+    python -m benchmarks.user_suggestions [sizes ...]
+"""
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db_models import Base, User
+from user_index import UserIndex
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+FILTERS = ['a', 'an', 'ann', 'anna', 'nna_', 'zzz', 'annotator_1']
+
+
+def build_database(path, size):
+    engine = create_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    rng = random.Random(0)
+    names = {f'annotator_{i}' for i in range(size // 10)}
+    while len(names) < size:
+        names.add(''.join(rng.choices(string.ascii_lowercase + '_', k=rng.randint(4, 12))))
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert(), [{'user': name} for name in names])
+    return engine
+
+
+def time_ms(function, repeats=50):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for text in FILTERS:
+            function(text)
+    return (time.perf_counter() - start) / (repeats * len(FILTERS)) * 1000
+
+
+def main(sizes):
+    print(f"{'users':>8}{'ilike ms':>12}{'index ms':>12}{'build ms':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            engine = build_database(os.path.join(tmp, f'users_{size}.db'), size)
+            Session = sessionmaker(bind=engine)
+            session = Session()
+
+            ilike_ms = time_ms(lambda text: session.query(User.user).filter(User.user.ilike(f'%{text}%')).all(),
+                               repeats=5)
+            index = UserIndex(Session)
+            start = time.perf_counter()
+            index.load()
+            build_ms = (time.perf_counter() - start) * 1000
+            index_ms = time_ms(lambda text: index.search(text, limit=10))
+
+            print(f"{size:>8}{ilike_ms:>12.3f}{index_ms:>12.4f}{build_ms:>12.1f}")
+            session.close()
+            engine.dispose()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
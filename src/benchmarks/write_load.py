@@ -0,0 +1,100 @@
+"""
+Multi-client load test for the database setup.
+Concurrent annotator threads write queries with six answers each while
+reader threads page through the query table. Compares the default engine
+(rollback journal, shared pool) with the WAL/single-writer setup.
+Run from the src directory:
+    python -m benchmarks.write_load [writers] [readers] [seconds]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+import migrations
+from database import create_engines
+from db_models import Base, User, Question, Query, Answer
+
+ANSWERS_PER_QUERY = 6
+
+
+def setup(write_engine):
+    Base.metadata.create_all(write_engine)
+    migrations.upgrade(write_engine)
+    session = sessionmaker(bind=write_engine)()
+    session.add(User(user='annotator'))
+    session.add(Question(type='ADVERSARIAL', category='HEALTH', question='Q?', correct_answer='A'))
+    session.commit()
+    session.close()
+
+
+def writer(Session, stop, counters):
+    while not stop.is_set():
+        session = Session()
+        try:
+            query = Query(user='annotator', question_id=1)
+            session.add(query)
+            session.flush()
+            session.add_all(Answer(answer='x' * 500, model=1, query_id=query.id, position=i)
+                            for i in range(ANSWERS_PER_QUERY))
+            session.commit()
+            counters['writes'] += 1
+        except OperationalError:
+            session.rollback()
+            counters['errors'] += 1
+        finally:
+            session.close()
+
+
+def reader(Session, stop, counters):
+    while not stop.is_set():
+        session = Session()
+        try:
+            session.query(Query.id, Query.timestamp).order_by(Query.timestamp.desc(), Query.id.desc()).limit(50).all()
+            counters['reads'] += 1
+        except OperationalError:
+            counters['errors'] += 1
+        finally:
+            session.close()
+
+
+def run_setup(name, write_engine, read_engine, writers, readers, seconds):
+    setup(write_engine)
+    WriteSession = sessionmaker(bind=write_engine)
+    ReadSession = sessionmaker(bind=read_engine)
+    counters = {'writes': 0, 'reads': 0, 'errors': 0}
+    stop = threading.Event()
+
+    threads = [threading.Thread(target=writer, args=(WriteSession, stop, counters)) for _ in range(writers)]
+    threads += [threading.Thread(target=reader, args=(ReadSession, stop, counters)) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    print(f"{name:<22}{counters['writes'] / seconds:>14.1f}{counters['reads'] / seconds:>14.1f}{counters['errors']:>10}")
+    write_engine.dispose()
+    read_engine.dispose()
+
+
+def main(writers=8, readers=4, seconds=5):
+    print(f"{writers} writers, {readers} readers, {seconds}s per setup")
+    print(f"{'setup':<22}{'commits/s':>14}{'reads/s':>14}{'errors':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        default_url = f"sqlite:///{os.path.join(tmp, 'default.db')}"
+        default_engine = create_engine(default_url)
+        run_setup('default', default_engine, default_engine, writers, readers, seconds)
+
+        tuned_url = f"sqlite:///{os.path.join(tmp, 'tuned.db')}"
+        run_setup('wal + single writer', *create_engines(tuned_url), writers, readers, seconds)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:4]])
@@ -0,0 +1,253 @@
+"""
+Batched write path for answers, metaprompts and feedback.
+The whole payload is validated before anything is written, foreign keys are
+resolved with one IN (...) query per table and rows are inserted with
+executemany-style INSERT ... RETURNING statements.
+"""
+from sqlalchemy import func, insert, select, update
+
+from answer_stats import FEEDBACK_METRICS, INSERT_METRICS, record_metrics
+from db_models import Answer, Feedback, Metaprompt, Query, User
+
+ANSWER_FIELDS = ['answer', 'model', 'user', 'strategy', 'query_id']
+METAPROMPT_FIELDS = ['strategy_name', 'metaPrompt', 'prompt_model']
+FEEDBACK_FIELDS = ['answer_id', 'user', 'completeness', 'relevance', 'clarity']
+
+
+class BatchValidationError(ValueError):
+    """Raised before any write when an entry of the payload is invalid"""
+
+    def __init__(self, message, errors):
+        super().__init__(message)
+        self.errors = errors  # [{'index': int, 'error': str}]
+
+
+class QueryNotFoundError(LookupError):
+    """An answer references a query that does not exist for its user"""
+
+
+def _tokens(data):
+    tokens = data.get('tokens') or {}
+    return {
+        'prompt_eval_count': tokens.get('prompt_eval_count', 0),
+        'eval_count': tokens.get('eval_count', 0),
+        'total_tokens': tokens.get('total_tokens', 0),
+    }
+
+
+def _split_tokens(tokens, parts):
+    """
+    Split the token counts of one generation into `parts` shares whose sums
+    equal the original counts (remainders go to the first shares).
+    """
+    def split(count):
+        share, remainder = divmod(count, parts)
+        return [share + (i < remainder) for i in range(parts)]
+
+    prompt_counts = split(tokens['prompt_eval_count'])
+    eval_counts = split(tokens['eval_count'])
+    extra = split(tokens['total_tokens'] - tokens['prompt_eval_count'] - tokens['eval_count'])
+    return [
+        {'prompt_eval_count': p, 'eval_count': e, 'total_tokens': p + e + x}
+        for p, e, x in zip(prompt_counts, eval_counts, extra)
+    ]
+
+
+def _insert_returning_ids(session, model, rows):
+    """Insert rows in one executemany statement and return their ids in order"""
+    if not rows:
+        return []
+    # RETURNING order is not guaranteed to follow the VALUES order, so
+    # SQLAlchemy correlates the ids with the parameter sets. SQLite has no
+    # insert sentinel, so this runs one statement per row in the transaction.
+    result = session.execute(insert(model).returning(model.id, sort_by_parameter_order=True), rows)
+    return list(result.scalars())
+
+
+def insert_answers(session, lookups, answers):
+    """
+    Insert answers and their optional metaprompts.
+    Answers for unknown models are skipped, as are metaprompts with an
+    unknown strategy or prompt model. Nothing is written if the payload is
+    invalid or references a missing query.
+
+    Args:
+        session: Session bound to the write engine (not committed here)
+        lookups: LookupRegistry for model, strategy and question ids
+        answers: List of answer dicts as sent by the frontend
+
+    Returns:
+        tuple: (results for the response, [(answer_id, query_id, answer, reference)] to score)
+    """
+    errors = [
+        {'index': idx, 'error': f'Missing fields in one of the answers: {answer_data}'}
+        for idx, answer_data in enumerate(answers)
+        if not isinstance(answer_data, dict) or not all(field in answer_data for field in ANSWER_FIELDS)
+    ]
+    if errors:
+        raise BatchValidationError(errors[0]['error'], errors)
+
+    query_ids = {answer_data['query_id'] for answer_data in answers}
+    queries = {
+        row.id: row for row in session.execute(
+            select(Query.id, Query.user, Query.question_id).where(Query.id.in_(query_ids))
+        )
+    }
+    for answer_data in answers:
+        query = queries.get(answer_data['query_id'])
+        if query is None or query.user != answer_data['user']:
+            raise QueryNotFoundError(answer_data['query_id'])
+
+    accepted = [answer_data for answer_data in answers if lookups.model_id(answer_data['model']) is not None]
+
+    answer_ids = _insert_returning_ids(session, Answer, [
+        {
+            'answer': answer_data['answer'],
+            'model': lookups.model_id(answer_data['model']),
+            'query_id': answer_data['query_id'],
+            'position': answer_data.get('position', 0),
+            'response_time': answer_data.get('response_time', 0.0),
+            'time_to_first_token': answer_data.get('time_to_first_token'),
+            'cached': bool(answer_data.get('cached', False)),
+            # Scores are filled in by the scoring queue
+            'precision': None,
+            'recall': None,
+            'f1': None,
+            **_tokens(answer_data),
+        }
+        for answer_data in accepted
+    ])
+
+    metaprompt_rows = []
+    metaprompt_positions = []  # index into accepted for every metaprompt row
+    for idx, (answer_data, answer_id) in enumerate(zip(accepted, answer_ids)):
+        metaprompt_data = answer_data.get('metaprompt_data')
+        if not metaprompt_data or answer_data['strategy'] == 'none':
+            continue
+        if not all(field in metaprompt_data for field in METAPROMPT_FIELDS):
+            continue
+        strategy_id = lookups.strategy_id(metaprompt_data['strategy_name'])
+        prompt_model_id = lookups.model_id(metaprompt_data['prompt_model'])
+        if strategy_id is None or prompt_model_id is None:
+            continue
+        metaprompt_rows.append({
+            'query_id': answer_data['query_id'],
+            'strategy_id': strategy_id,
+            'model_id': prompt_model_id,
+            'prompt': metaprompt_data['metaPrompt'],
+            'answer_id': answer_id,
+            **_tokens(metaprompt_data),
+        })
+        metaprompt_positions.append(idx)
+
+    # A meta-prompt generated once for several output models is marked as
+    # shared; each answer gets its share, so the tokens are counted once
+    shared_groups = {}
+    for row, idx in zip(metaprompt_rows, metaprompt_positions):
+        if accepted[idx]['metaprompt_data'].get('shared'):
+            key = (row['query_id'], row['strategy_id'], row['model_id'], row['prompt'])
+            shared_groups.setdefault(key, []).append(row)
+    for rows in shared_groups.values():
+        for row, tokens in zip(rows, _split_tokens(dict(rows[0]), len(rows))):
+            row.update(tokens)
+    metaprompt_ids = dict(zip(metaprompt_positions, _insert_returning_ids(session, Metaprompt, metaprompt_rows)))
+    record_metrics(session, answer_ids, INSERT_METRICS)
+
+    answer_counts = {}
+    for answer_data in accepted:
+        answer_counts[answer_data['query_id']] = answer_counts.get(answer_data['query_id'], 0) + 1
+    for query_id, count in answer_counts.items():
+        session.execute(
+            update(Query).where(Query.id == query_id)
+            .values(answer_count=func.coalesce(Query.answer_count, 0) + count)
+        )
+
+    results = []
+    to_score = []
+    for idx, (answer_data, answer_id) in enumerate(zip(accepted, answer_ids)):
+        query = queries[answer_data['query_id']]
+        question = lookups.question(query.question_id)
+        to_score.append((answer_id, query.id, answer_data['answer'], question.correct_answer))
+        metaprompt_data = answer_data.get('metaprompt_data')
+        results.append({
+            'answer_id': answer_id,
+            'query_id': query.id,
+            'model': answer_data['model'],
+            'strategy': answer_data['strategy'],
+            'metaprompt_id': metaprompt_ids.get(idx),
+            'prompt_model': metaprompt_data.get('prompt_model') if metaprompt_data else None,
+            'tokens': _tokens(answer_data),
+        })
+    return results, to_score
+
+
+def insert_feedback_entries(session, entries):
+    """
+    Insert feedback entries and link them to their answers.
+    Invalid entries are reported per index and skipped; all valid entries
+    are written together.
+
+    Args:
+        session: Session bound to the write engine (not committed here)
+        entries: List of feedback dicts as sent by the frontend
+
+    Returns:
+        tuple: (results, errors) as lists of dicts with the entry index
+    """
+    errors = []
+    valid = []  # (index, entry, scores)
+    for idx, entry in enumerate(entries):
+        if not isinstance(entry, dict) or not all(field in entry for field in FEEDBACK_FIELDS):
+            errors.append({'index': idx, 'error': 'Missing required fields'})
+            continue
+        try:
+            scores = {name: float(entry[name]) for name in ('completeness', 'relevance', 'clarity')}
+            # "12" and 12 must look up (and deduplicate) the same answer
+            entry = {**entry, 'answer_id': int(entry['answer_id'])}
+        except (TypeError, ValueError) as e:
+            errors.append({'index': idx, 'error': f'Invalid numeric value: {str(e)}'})
+            continue
+        valid.append((idx, entry, scores))
+
+    users = {entry['user'] for _, entry, _ in valid}
+    known_users = set(session.scalars(select(User.user).where(User.user.in_(users)))) if users else set()
+    answer_ids = {entry['answer_id'] for _, entry, _ in valid}
+    answers = dict(session.execute(
+        select(Answer.id, Answer.feedback_id).where(Answer.id.in_(answer_ids))
+    ).all()) if answer_ids else {}
+
+    accepted = []
+    for idx, entry, scores in valid:
+        if entry['user'] not in known_users:
+            errors.append({'index': idx, 'error': 'User not found'})
+        elif entry['answer_id'] not in answers:
+            errors.append({'index': idx, 'error': 'Answer not found'})
+        elif answers[entry['answer_id']]:
+            errors.append({'index': idx, 'error': 'Feedback already exists for this answer'})
+        else:
+            answers[entry['answer_id']] = True  # A second entry for the same answer in this batch is rejected
+            accepted.append((idx, entry, scores))
+
+    feedback_ids = _insert_returning_ids(session, Feedback, [
+        {'user': entry['user'], **scores} for _, entry, scores in accepted
+    ])
+    if feedback_ids:
+        # ORM bulk UPDATE by primary key, executed as a single executemany
+        session.execute(update(Answer), [
+            {'id': entry['answer_id'], 'feedback_id': feedback_id}
+            for (_, entry, _), feedback_id in zip(accepted, feedback_ids)
+        ])
+        record_metrics(session, [entry['answer_id'] for _, entry, _ in accepted], FEEDBACK_METRICS)
+
+    results = [
+        {
+            'feedback_id': feedback_id,
+            'answer_id': entry['answer_id'],
+            'user': entry['user'],
+            'status': 'created',
+            'index': idx
+        }
+        for (idx, entry, _), feedback_id in zip(accepted, feedback_ids)
+    ]
+    errors.sort(key=lambda error: error['index'])
+    return results, errors
@@ -0,0 +1,139 @@
+"""
+Streaming executor for ad-hoc analysis queries.
+Queries run on a read-only SQLite connection and are streamed as chunked
+JSON, bounded by row, byte and time limits and cancellable while running.
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+
+class QueryLimits:
+    """Limits applied to a single custom query"""
+
+    def __init__(self, max_rows=10000, max_bytes=20 * 1024**2, timeout=10.0):
+        """
+        Args:
+            max_rows: Maximum number of rows returned
+            max_bytes: Maximum size of the serialized rows
+            timeout: Seconds before the query is interrupted
+        """
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+
+
+class CustomQueryExecutor:
+    """Runs SELECT statements on a read-only connection and streams the results"""
+
+    # Number of SQLite VM instructions between two progress handler calls
+    PROGRESS_INTERVAL = 10000
+    FETCH_SIZE = 200
+
+    def __init__(self, database_path, limits=None):
+        self.database_path = database_path
+        self.limits = limits or QueryLimits()
+        self._running = {}  # query id -> cancel event
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # mode=ro: analysis queries can never write and don't take write locks
+        return sqlite3.connect(f"file:{self.database_path}?mode=ro", uri=True, check_same_thread=False)
+
+    def cancel(self, query_id):
+        """Cancel a running query; returns False if it is not running"""
+        with self._lock:
+            event = self._running.get(query_id)
+        if event is None:
+            return False
+        event.set()
+        return True
+
+    def start(self, sql_query):
+        """
+        Execute the query and return its id and a generator of JSON chunks.
+        Errors while preparing the statement are raised right away, so they
+        can be reported with a proper status code.
+
+        Returns:
+            tuple: (query_id, generator yielding str chunks)
+        """
+        query_id = uuid.uuid4().hex
+        cancelled = threading.Event()
+        deadline = time.monotonic() + self.limits.timeout
+
+        def progress():
+            # A non-zero return value interrupts the running statement
+            return 1 if cancelled.is_set() or time.monotonic() > deadline else 0
+
+        conn = self._connect()
+        try:
+            conn.set_progress_handler(progress, self.PROGRESS_INTERVAL)
+            cursor = conn.execute(sql_query)
+        except sqlite3.OperationalError as e:
+            conn.close()
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Query exceeded the time limit of {self.limits.timeout}s") from e
+            raise
+        except Exception:
+            conn.close()
+            raise
+
+        with self._lock:
+            self._running[query_id] = cancelled
+
+        return query_id, self._stream(query_id, conn, cursor, cancelled, deadline)
+
+    def _stream(self, query_id, conn, cursor, cancelled, deadline):
+        columns = [description[0] for description in cursor.description or []]
+        row_count = 0
+        byte_count = 0
+        truncated = None
+        error = None
+
+        try:
+            yield '{"columns": ' + json.dumps(columns) + ', "rows": ['
+            while truncated is None:
+                try:
+                    batch = cursor.fetchmany(self.FETCH_SIZE)
+                except sqlite3.OperationalError as e:
+                    if cancelled.is_set():
+                        truncated = 'cancelled'
+                    elif time.monotonic() > deadline:
+                        truncated = 'timeout'
+                    else:
+                        error = str(e)
+                    break
+                if not batch:
+                    break
+
+                chunk = []
+                for row in batch:
+                    # NULL values are shown as "NULL" like before
+                    record = {col: ("NULL" if value is None else value) for col, value in zip(columns, row)}
+                    encoded = json.dumps(record, default=str)
+                    if row_count >= self.limits.max_rows:
+                        truncated = 'max_rows'
+                        break
+                    if byte_count + len(encoded) > self.limits.max_bytes:
+                        truncated = 'max_bytes'
+                        break
+                    chunk.append(encoded)
+                    row_count += 1
+                    byte_count += len(encoded)
+
+                if chunk:
+                    yield (', ' if row_count > len(chunk) else '') + ', '.join(chunk)
+
+            footer = {'row_count': row_count, 'truncated': truncated, 'query_id': query_id}
+            if error:
+                footer.update({'error': 'Query execution failed', 'details': error})
+            yield '], ' + json.dumps(footer)[1:]
+        finally:
+            # Also reached when the client disconnects and the generator is closed
+            cancelled.set()
+            with self._lock:
+                self._running.pop(query_id, None)
+            conn.close()
@@ -0,0 +1,268 @@
+"""
+Columnar export of the answer-level dataset (Parquet or Arrow IPC).
+One row per answer, joined with its query, question, metaprompt and feedback.
+Answers are read in keyset-paginated chunks and every chunk is written as
+its own row group / record batch, so an export never holds the whole
+dataset in memory. Model, strategy, category and other low-cardinality
+columns are dictionary-encoded with the same dictionary in every chunk,
+so pandas and Polars load them as categoricals.
+Run from the src directory:
+    python data_export.py --format parquet --output answers.parquet
+"""
+import argparse
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import String, func, select, type_coerce
+from sqlalchemy.orm import aliased, sessionmaker
+
+from database import create_engines
+from db_models import (Answer, Feedback, Metaprompt, Model, Query, Question, QuestionCategory, QuestionType,
+                       Strategy, User)
+
+DEFAULT_DATABASE_URL = 'sqlite:///mpe_database.db'
+DEFAULT_CHUNK_SIZE = 5000
+FORMATS = {
+    # format -> (file extension, mimetype)
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('arrows', 'application/vnd.apache.arrow.stream'),
+}
+
+_DICTIONARY = pa.dictionary(pa.int32(), pa.string())
+
+SCHEMA = pa.schema([
+    ('answer_id', pa.int64()),
+    ('query_id', pa.int64()),
+    ('timestamp', pa.timestamp('us')),
+    ('user', _DICTIONARY),
+    ('question_id', pa.int32()),
+    ('question_type', _DICTIONARY),
+    ('category', _DICTIONARY),
+    ('question', pa.string()),
+    ('correct_answer', pa.string()),
+    ('model', _DICTIONARY),
+    ('strategy', _DICTIONARY),
+    ('position', pa.int32()),
+    ('answer', pa.string()),
+    ('is_best', pa.bool_()),
+    ('response_time', pa.float64()),
+    ('time_to_first_token', pa.float64()),
+    ('cached', pa.bool_()),
+    ('precision', pa.float64()),
+    ('recall', pa.float64()),
+    ('f1', pa.float64()),
+    ('prompt_eval_count', pa.int64()),
+    ('eval_count', pa.int64()),
+    ('total_tokens', pa.int64()),
+    ('prompt_model', _DICTIONARY),
+    ('metaprompt', pa.string()),
+    ('metaprompt_prompt_eval_count', pa.int64()),
+    ('metaprompt_eval_count', pa.int64()),
+    ('metaprompt_total_tokens', pa.int64()),
+    ('completeness', pa.float64()),
+    ('relevance', pa.float64()),
+    ('clarity', pa.float64()),
+])
+
+
+def _answer_query(after_id, last_id, chunk_size):
+    AnswerModel = aliased(Model)
+    PromptModel = aliased(Model)
+    return (
+        select(
+            Answer.id.label('answer_id'),
+            Query.id.label('query_id'),
+            Query.timestamp,
+            Query.user,
+            Question.id.label('question_id'),
+            type_coerce(Question.type, String).label('question_type'),
+            type_coerce(Question.category, String).label('category'),
+            Question.question,
+            Question.correct_answer,
+            AnswerModel.name.label('model'),
+            func.coalesce(Strategy.name, 'none').label('strategy'),
+            Answer.position,
+            Answer.answer,
+            (Query.best_answer_id == Answer.id).label('is_best'),
+            Answer.response_time,
+            Answer.time_to_first_token,
+            Answer.cached,
+            Answer.precision,
+            Answer.recall,
+            Answer.f1,
+            Answer.prompt_eval_count,
+            Answer.eval_count,
+            Answer.total_tokens,
+            PromptModel.name.label('prompt_model'),
+            Metaprompt.prompt.label('metaprompt'),
+            Metaprompt.prompt_eval_count.label('metaprompt_prompt_eval_count'),
+            Metaprompt.eval_count.label('metaprompt_eval_count'),
+            Metaprompt.total_tokens.label('metaprompt_total_tokens'),
+            Feedback.completeness,
+            Feedback.relevance,
+            Feedback.clarity,
+        )
+        .select_from(Answer)
+        .join(AnswerModel, Answer.model == AnswerModel.id)
+        .join(Query, Answer.query_id == Query.id)
+        .join(Question, Query.question_id == Question.id)
+        .outerjoin(Metaprompt, Metaprompt.answer_id == Answer.id)
+        .outerjoin(Strategy, Metaprompt.strategy_id == Strategy.id)
+        .outerjoin(PromptModel, Metaprompt.model_id == PromptModel.id)
+        .outerjoin(Feedback, Answer.feedback_id == Feedback.id)
+        .where(Answer.id > after_id, Answer.id <= last_id)
+        .order_by(Answer.id)
+        .limit(chunk_size)
+    )
+
+
+class _Dictionary:
+    """Fixed dictionary of a dictionary-encoded column, shared by all batches"""
+
+    def __init__(self, labels):
+        """
+        Args:
+            labels: {stored value: dictionary entry}
+        """
+        self.entries = list(dict.fromkeys(labels.values()))
+        positions = {entry: i for i, entry in enumerate(self.entries)}
+        self.index = {value: positions[label] for value, label in labels.items()}
+
+    def encode(self, values):
+        for value in values:
+            if value is not None and value not in self.index:
+                # Only possible for rows written while the export runs
+                self.index[value] = len(self.entries)
+                self.entries.append(value)
+        return pa.DictionaryArray.from_arrays(
+            pa.array([None if value is None else self.index[value] for value in values], type=pa.int32()),
+            pa.array(self.entries, type=pa.string())
+        )
+
+
+def _dictionaries(session):
+    """Dictionaries of the encoded columns; stored enum names become their display values"""
+    models = list(session.scalars(select(Model.name).order_by(Model.id)))
+    strategies = ['none', *session.scalars(select(Strategy.name).where(Strategy.name != 'none').order_by(Strategy.id))]
+    users = session.scalars(select(User.user).order_by(User.user))
+    return {
+        'user': _Dictionary({name: name for name in users}),
+        'question_type': _Dictionary({t.name: t.value for t in QuestionType}),
+        'category': _Dictionary({c.name: c.value for c in QuestionCategory}),
+        'model': _Dictionary({name: name for name in models}),
+        'strategy': _Dictionary({name: name for name in strategies}),
+        'prompt_model': _Dictionary({name: name for name in models}),
+    }
+
+
+def iter_record_batches(session, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield the answer-level dataset as pyarrow RecordBatches of up to chunk_size rows.
+    Only answers that existed when the export started are included.
+    """
+    last_id = session.scalar(select(func.max(Answer.id))) or 0
+    dictionaries = _dictionaries(session)
+    after_id = 0
+    while after_id < last_id:
+        rows = session.execute(_answer_query(after_id, last_id, chunk_size)).all()
+        if not rows:
+            break
+        after_id = rows[-1].answer_id
+
+        columns = []
+        for field in SCHEMA:
+            values = [getattr(row, field.name) for row in rows]
+            if field.name in dictionaries:
+                columns.append(dictionaries[field.name].encode(values))
+            else:
+                columns.append(pa.array(values, type=field.type))
+        yield pa.RecordBatch.from_arrays(columns, schema=SCHEMA)
+
+
+def _open_writer(sink, export_format):
+    if export_format == 'parquet':
+        return pq.ParquetWriter(sink, SCHEMA, compression='zstd')
+    if export_format == 'arrow':
+        return pa.ipc.new_stream(sink, SCHEMA)
+    raise ValueError(f"Unknown export format: {export_format}")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out everything written since the last drain()"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        # Parquet stores absolute offsets, so the position never resets
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_export(session, export_format='parquet', chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the encoded export as bytes, one chunk per record batch"""
+    sink = _ChunkSink()
+    writer = _open_writer(sink, export_format)
+    try:
+        for batch in iter_record_batches(session, chunk_size):
+            writer.write_batch(batch)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_to_file(session, path, export_format='parquet', chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Write the export to a file.
+
+    Returns:
+        int: Number of exported answers
+    """
+    rows = 0
+    with _open_writer(path, export_format) as writer:
+        for batch in iter_record_batches(session, chunk_size):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the answer-level dataset to Parquet or Arrow IPC")
+    parser.add_argument('--format', choices=list(FORMATS), default='parquet')
+    parser.add_argument('--output', help="Output file (default: mpe_answers.<extension>)")
+    parser.add_argument('--database', default=DEFAULT_DATABASE_URL, help="SQLAlchemy database URL")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Answers per row group / batch")
+    args = parser.parse_args()
+
+    output = args.output or f"mpe_answers.{FORMATS[args.format][0]}"
+    write_engine, read_engine = create_engines(args.database, read_pool_size=1)
+    session = sessionmaker(bind=read_engine)()
+    try:
+        rows = export_to_file(session, output, args.format, args.chunk_size)
+    finally:
+        session.close()
+        write_engine.dispose()
+        read_engine.dispose()
+    print(f"Exported {rows} answers to {output}")
+
+
+if __name__ == '__main__':
+    main()
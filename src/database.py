@@ -0,0 +1,49 @@
+"""
+SQLite engine setup.
+The database runs in WAL mode so readers never block the writer. Writes go
+through an engine with a single pooled connection, which serializes them
+inside the process instead of failing with "database is locked"; reads use
+a separate pool of query-only connections.
+"""
+from sqlalchemy import create_engine, event
+
+# Applied to every new connection
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',     # Safe with WAL, only the last commits can be lost on power failure
+    'busy_timeout': 5000,        # ms to wait for locks held by other processes
+    'cache_size': -64000,        # KiB (negative) of page cache per connection
+    'mmap_size': 268435456,      # bytes of memory-mapped I/O
+}
+
+
+def _set_pragmas(engine, read_only):
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        if read_only:
+            cursor.execute('PRAGMA query_only = ON')
+        cursor.close()
+
+
+def create_engines(database_url, read_pool_size=8, echo=False):
+    """
+    Create the writer and reader engines for a SQLite database.
+
+    Args:
+        database_url: SQLAlchemy URL of the database file
+        read_pool_size: Number of pooled reader connections
+        echo: Log SQL statements
+
+    Returns:
+        tuple: (write_engine, read_engine)
+    """
+    # One connection: concurrent writers queue for it instead of racing for the file lock
+    write_engine = create_engine(database_url, echo=echo, pool_size=1, max_overflow=0, pool_timeout=60)
+    read_engine = create_engine(database_url, echo=echo, pool_size=read_pool_size, max_overflow=read_pool_size)
+
+    _set_pragmas(write_engine, read_only=False)
+    _set_pragmas(read_engine, read_only=True)
+    return write_engine, read_engine
@@ -2,6 +2,59 @@
 This project processes data from TruthfulQA dataset
 Source: https://github.com/sylinrl/TruthfulQA (Apache-2.0)
 """
+import hashlib
+import json
+import os
+from pathlib import Path
+
+TRUTHFULQA_URL = 'https://raw.githubusercontent.com/sylinrl/TruthfulQA/main/TruthfulQA.csv'
+
+# Pre-filtered copy of the dataset with its SHA-256 checksum next to it,
+# kept in the user cache directory so the download never lands in the checkout
+CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'mpe'
+CACHE_PATH = CACHE_DIR / "truthfulqa_filtered.json"
+
+def load_truthfulqa_data(cache_path=CACHE_PATH):
+    """
+    Load the filtered TruthfulQA rows, preferring the local copy.
+    The CSV is only downloaded and filtered if the local copy is missing or
+    fails checksum validation; the result is then written back as local copy.
+    
+    Args:
+        cache_path: JSON file with the filtered rows
+    
+    Returns:
+        list: Dicts with the keys Type, Category, Question, Correct Answers, Source
+    """
+    cache_path = Path(cache_path)
+    rows = _read_cache(cache_path)
+    if rows is not None:
+        return rows
+
+    import pandas as pd
+    rows = filter_truthfulqa_data(pd).to_dict('records')
+    _write_cache(cache_path, rows)
+    return rows
+
+def _checksum_path(cache_path):
+    return cache_path.with_name(cache_path.name + '.sha256')
+
+def _read_cache(cache_path):
+    checksum_path = _checksum_path(cache_path)
+    if not (cache_path.exists() and checksum_path.exists()):
+        return None
+
+    content = cache_path.read_bytes()
+    if hashlib.sha256(content).hexdigest() != checksum_path.read_text().strip():
+        print(f"Checksum mismatch for {cache_path}, downloading TruthfulQA again")
+        return None
+    return json.loads(content)
+
+def _write_cache(cache_path, rows):
+    content = json.dumps(rows, indent=1, ensure_ascii=False).encode('utf-8')
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    cache_path.write_bytes(content)
+    _checksum_path(cache_path).write_text(hashlib.sha256(content).hexdigest() + '\n')
 
 def filter_truthfulqa_data(pd):
     """
@@ -15,7 +68,7 @@ def filter_truthfulqa_data(pd):
     """
     
     # Load data
-    df = pd.read_csv('https://raw.githubusercontent.com/sylinrl/TruthfulQA/main/TruthfulQA.csv')
+    df = pd.read_csv(TRUTHFULQA_URL)
     
     # Select only needed columns
     columns_needed = ['Type', 'Category', 'Question', 'Correct Answers', 'Source']
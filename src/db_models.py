@@ -1,4 +1,4 @@
-from sqlalchemy import DateTime, Column, String, Integer, Float, ForeignKey, Text, Enum as SQLEnum
+from sqlalchemy import Boolean, DateTime, Column, String, Integer, Float, ForeignKey, Index, Text, Enum as SQLEnum
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -41,12 +41,20 @@ class Model(Base):
 
     answers = relationship("Answer", back_populates="model_rel")
 
+    __table_args__ = (
+        Index('ux_models_name', 'name', unique=True),
+    )
+
 class Strategy(Base):
     """Strategy table to store different prompting strategies"""
     __tablename__ = 'strategies'
     
     id = Column(Integer, primary_key=True)
     name = Column(String)
+
+    __table_args__ = (
+        Index('ux_strategies_name', 'name', unique=True),
+    )
     
 class Question(Base):
     """Question table to store questions with reference answers"""
@@ -59,6 +67,10 @@ class Question(Base):
     correct_answer = Column(Text)
     source = Column(Text)
 
+    __table_args__ = (
+        Index('ux_questions_question', 'question', unique=True),
+    )
+
 class QuestionCounter(Base):
     """Counts of how often each user repeats specific questions."""
     __tablename__ = 'question_counters'
@@ -76,6 +88,12 @@ class Query(Base):
     question_id = Column(Integer, ForeignKey('questions.id'))
     best_answer_id = Column(Integer, ForeignKey('answers.id'))
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    answer_count = Column(Integer, default=0)  # Maintained by insert_answer
+
+    __table_args__ = (
+        Index('ix_queries_timestamp_id', 'timestamp', 'id'),  # Keyset pagination of /api/queries
+        Index('ix_queries_user', 'user'),
+    )
 
 class Answer(Base):
     """Answer table to store generated answers with metadata"""
@@ -86,6 +104,8 @@ class Answer(Base):
     model = Column(Integer, ForeignKey('models.id'))
     feedback_id = Column(Integer, ForeignKey('feedback.id'))
     response_time = Column(Float)
+    time_to_first_token = Column(Float)  # Seconds until the first streamed token
+    cached = Column(Boolean, default=False)  # Served from the generation cache
     query_id = Column(Integer, ForeignKey('queries.id'))
     position = Column(Integer)
     precision = Column(Float)
@@ -98,6 +118,10 @@ class Answer(Base):
     total_tokens = Column(Integer)       # Total number of tokens
     
     model_rel = relationship("Model")
+
+    __table_args__ = (
+        Index('ix_answers_query_id', 'query_id'),
+    )
     
 class Feedback(Base):
     """Feedback table to store quality ratings for answers"""
@@ -128,3 +152,19 @@ class Metaprompt(Base):
     strategy = relationship("Strategy", foreign_keys=[strategy_id])
     answer = relationship("Answer", foreign_keys=[answer_id])
     query = relationship("Query", foreign_keys=[query_id])
+
+    __table_args__ = (
+        Index('ix_metaprompts_answer_id', 'answer_id'),
+    )
+
+class AnswerStat(Base):
+    """Running sums of an answer metric per (model, strategy, category), maintained on every write"""
+    __tablename__ = 'answer_stats'
+
+    model = Column(String, primary_key=True)
+    strategy = Column(String, primary_key=True)
+    category = Column(String, primary_key=True)  # Question category as stored in questions.category
+    metric = Column(String, primary_key=True)
+    n = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)     # Sum of the values
+    total_sq = Column(Float, nullable=False, default=0.0)  # Sum of the squared values
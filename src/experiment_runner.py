@@ -0,0 +1,336 @@
+"""
+Headless batch experiment runner.
+Runs a grid of questions x output models x strategies (x prompt models)
+against Ollama without the browser and stores the results like the UI does:
+one query per question with its answers and metaprompts, written in bulk.
+Finished boxes are appended to a checkpoint file, so an interrupted run
+resumes where it stopped. A failed box is retried a few times; if it still
+fails, its question is left unwritten and rerunning the same run id retries it.
+Ctrl-C cancels the boxes that have not started, but the process only exits
+once the generations already running have returned (their results are not
+checkpointed). Answers are stored unscored; the app scores them when it
+starts (ScoringQueue.requeue_unscored).
+Run from the src directory:
+    python experiment_runner.py --run-id sweep1 [--models ...] [--strategies ...]
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from bulk_writes import insert_answers
+from db_models import Query, Question, QuestionCounter, User
+from strategies import NO_STRATEGY, STRATEGY_NAMES, run_strategy
+
+CHECKPOINT_DIR = 'runs'
+DEFAULT_USER = 'experiment-runner'
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RETRIES = 2  # extra attempts per failed box
+PROGRESS_INTERVAL = 10.0  # seconds between progress lines
+
+
+class Box:
+    """One output box of the grid: a question answered by a model with a strategy"""
+
+    def __init__(self, question_id, prompt, output_model, strategy, prompt_model):
+        self.question_id = question_id
+        self.prompt = prompt
+        self.output_model = output_model
+        self.strategy = strategy
+        self.prompt_model = prompt_model
+
+    @property
+    def key(self):
+        return f"{self.question_id}|{self.output_model}|{self.strategy}|{self.prompt_model or ''}"
+
+
+class Checkpoint:
+    """Append-only JSONL log of finished boxes and written queries"""
+
+    def __init__(self, path):
+        self.path = path
+        self.boxes = {}       # box key -> answer data
+        self.written = {}     # question id -> query id
+        self.config = None
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Last line of an interrupted write
+                    if entry['type'] == 'config':
+                        self.config = entry['config']
+                    elif entry['type'] == 'box':
+                        self.boxes[entry['key']] = entry['answer']
+                    elif entry['type'] == 'query':
+                        self.written[entry['question_id']] = entry['query_id']
+
+    def _append(self, entry):
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def start(self, config):
+        if self.config is None:
+            self.config = config
+            self._append({'type': 'config', 'config': config})
+        elif self.config != config:
+            print(f"Warning: checkpoint {self.path} was created with a different configuration")
+
+    def add_box(self, box, answer):
+        self._append({'type': 'box', 'key': box.key, 'answer': answer})
+        with self._lock:
+            self.boxes[box.key] = answer
+
+    def add_query(self, question_id, query_id):
+        self._append({'type': 'query', 'question_id': question_id, 'query_id': query_id})
+        with self._lock:
+            self.written[question_id] = query_id
+
+
+class ExperimentRunner:
+    """Runs the boxes of an experiment grid concurrently and writes finished questions"""
+
+    def __init__(self, session_factory, lookups, generate, checkpoint, user=DEFAULT_USER,
+                 concurrency=DEFAULT_CONCURRENCY, order_models=None, retries=DEFAULT_RETRIES):
+        """
+        Args:
+            session_factory: Session factory bound to the write engine
+            lookups: LookupRegistry for model, strategy and question ids
+            generate: Callable (prompt, model, system_prompt, final) returning
+                the /api/prompt body; raises on generation errors
+            checkpoint: Checkpoint of this run
+            user: User the queries are stored for
+            concurrency: Number of boxes generated at the same time
+            order_models: Optional callable sorting models, resident ones first
+            retries: How often a failed box is generated again before it is given up
+        """
+        self.session_factory = session_factory
+        self.lookups = lookups
+        self.generate = generate
+        self.checkpoint = checkpoint
+        self.user = user
+        self.concurrency = concurrency
+        self.order_models = order_models or (lambda models: models)
+        self.retries = retries
+        self.stats = {'generated': 0, 'failed': 0, 'retried': 0, 'written': 0}
+
+    def plan(self, questions, models, strategies, prompt_models=None):
+        """
+        All boxes of the grid, grouped by question.
+        Strategies other than 'none' get one box per prompt model (default:
+        the output model prompts itself).
+
+        Returns:
+            dict: question id -> list of Box
+        """
+        grid = {}
+        for question_id, prompt in questions:
+            boxes = grid[question_id] = []
+            for model in models:
+                for strategy in strategies:
+                    if strategy == NO_STRATEGY:
+                        boxes.append(Box(question_id, prompt, model, strategy, None))
+                    else:
+                        for prompt_model in prompt_models or [model]:
+                            boxes.append(Box(question_id, prompt, model, strategy, prompt_model))
+        return grid
+
+    def run(self, grid):
+        """Generate all unfinished boxes and write every question once all its boxes are done"""
+        pending = {
+            question_id: {box.key for box in boxes if box.key not in self.checkpoint.boxes}
+            for question_id, boxes in grid.items()
+            if question_id not in self.checkpoint.written
+        }
+        # Questions finished before an interruption but not written yet
+        for question_id in [q for q, keys in pending.items() if not keys]:
+            self._write_question(question_id, grid[question_id])
+
+        # Model-major order: consecutive jobs hit the same model, so Ollama swaps rarely
+        model_rank = {model: i for i, model in enumerate(self.order_models(
+            list(dict.fromkeys(box.output_model for boxes in grid.values() for box in boxes))
+        ))}
+        todo = sorted(
+            (box for question_id, keys in pending.items() for box in grid[question_id] if box.key in keys),
+            key=lambda box: (model_rank[box.output_model], box.prompt_model or '', box.strategy, box.question_id)
+        )
+        total = len(todo)
+        print(f"Running {total} boxes for {len(pending)} questions "
+              f"({sum(len(b) for b in grid.values()) - total} already done)")
+
+        start = last_report = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+
+        def submit(box):
+            return executor.submit(run_strategy, box.strategy, box.prompt, box.output_model,
+                                   box.prompt_model, self.generate)
+
+        attempts = {}  # box key -> failed attempts
+        try:
+            futures = {submit(box): box for box in todo}
+            while futures:
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    box = futures.pop(future)
+                    try:
+                        answer = future.result()
+                    except Exception as e:
+                        attempts[box.key] = attempts.get(box.key, 0) + 1
+                        if attempts[box.key] <= self.retries:
+                            self.stats['retried'] += 1
+                            print(f"Box {box.key} failed ({e}), retrying")
+                            futures[submit(box)] = box
+                        else:
+                            self.stats['failed'] += 1
+                            print(f"Box {box.key} failed: {e}")
+                        continue
+
+                    self.checkpoint.add_box(box, answer)
+                    self.stats['generated'] += 1
+                    keys = pending[box.question_id]
+                    keys.discard(box.key)
+                    if not keys:
+                        self._write_question(box.question_id, grid[box.question_id])
+
+                if time.monotonic() - last_report > PROGRESS_INTERVAL:
+                    last_report = time.monotonic()
+                    done = self.stats['generated'] + self.stats['failed']
+                    rate = done / (last_report - start)
+                    print(f"{done}/{total} boxes, {rate:.2f} boxes/s, "
+                          f"{self.stats['written']} questions written, {self.stats['failed']} failed")
+        except KeyboardInterrupt:
+            # Running generations can't be cancelled: the worker threads are
+            # joined at interpreter exit, so this returns once they are done
+            print("\nInterrupted, finished boxes are kept in the checkpoint; "
+                  "waiting for the running generations to return")
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+
+        print(f"Done in {time.monotonic() - start:.1f}s: {self.stats['generated']} boxes generated, "
+              f"{self.stats['failed']} failed, {self.stats['retried']} retries, "
+              f"{self.stats['written']} questions written")
+        if self.stats['failed']:
+            print("Questions with failed boxes were not written; rerun with the same --run-id to retry them")
+        return self.stats
+
+    def _write_question(self, question_id, boxes):
+        """Store the query of a question with all its answers in one transaction"""
+        session = self.session_factory()
+        try:
+            if session.query(User).filter_by(user=self.user).first() is None:
+                session.add(User(user=self.user))
+            query = Query(user=self.user, question_id=question_id, best_answer_id=None)
+            session.add(query)
+            session.flush()
+
+            answers = [
+                {**self.checkpoint.boxes[box.key], 'user': self.user, 'query_id': query.id, 'position': position}
+                for position, box in enumerate(boxes)
+            ]
+            insert_answers(session, self.lookups, answers)
+            session.execute(
+                sqlite_insert(QuestionCounter)
+                .values(user=self.user, question_id=question_id, count=1)
+                .on_conflict_do_update(
+                    index_elements=[QuestionCounter.user, QuestionCounter.question_id],
+                    set_={'count': QuestionCounter.count + 1}
+                )
+            )
+            session.commit()
+            query_id = query.id
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+        self.checkpoint.add_query(question_id, query_id)
+        self.stats['written'] += 1
+
+
+def load_questions(session_factory, question_ids=None, limit=None):
+    """(id, question text) pairs from the Question table"""
+    session = session_factory()
+    try:
+        query = session.query(Question.id, Question.question).order_by(Question.id)
+        if question_ids:
+            query = query.filter(Question.id.in_(question_ids))
+        if limit:
+            query = query.limit(limit)
+        return [(row.id, row.question) for row in query]
+    finally:
+        session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a models x strategies x questions grid without the browser")
+    parser.add_argument('--run-id', required=True, help="Name of the run; its checkpoint is runs/<run-id>.jsonl")
+    parser.add_argument('--models', nargs='+', help="Output models (default: all models)")
+    parser.add_argument('--strategies', nargs='+', help="Strategies (default: all strategies)")
+    parser.add_argument('--prompt-models', nargs='+', help="Meta-prompt models (default: the output model)")
+    parser.add_argument('--questions', nargs='+', type=int, help="Question ids (default: all questions)")
+    parser.add_argument('--limit', type=int, help="Only the first N questions")
+    parser.add_argument('--options', type=json.loads, default=None,
+                        help='Ollama options as JSON, e.g. \'{"seed": 42, "temperature": 0}\'')
+    parser.add_argument('--user', default=DEFAULT_USER, help="User the queries are stored for")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES, help="Extra attempts per failed box")
+    parser.add_argument('--start-service', action='store_true', help="Start Ollama via Apptainer first")
+    args = parser.parse_args()
+
+    # The app module holds the configured database, Ollama client and model scheduler
+    import mpe
+
+    models = args.models or mpe.MODELS
+    strategies = args.strategies or STRATEGY_NAMES
+    unknown = [m for m in models + (args.prompt_models or []) if m not in mpe.MODELS]
+    unknown += [s for s in strategies if s not in STRATEGY_NAMES]
+    if unknown:
+        parser.error(f"Unknown models or strategies: {', '.join(unknown)}")
+
+    mpe.init_database()
+    if args.start_service:
+        mpe.start_service()
+    elif not mpe.wait_for_ollama():
+        raise SystemExit("Ollama is not reachable")
+    else:
+        mpe.model_scheduler.refresh()
+
+    def generate(prompt, model, system_prompt, final=False):
+        with mpe.model_scheduler.use(model):
+            result = mpe.timed_generate(prompt, model, system_prompt, args.options)
+        if result.get('error'):
+            raise RuntimeError(result['error'])
+        return result
+
+    questions = load_questions(mpe.ReadSession, args.questions, args.limit)
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    checkpoint = Checkpoint(os.path.join(CHECKPOINT_DIR, f"{args.run_id}.jsonl"))
+    checkpoint.start({
+        'models': models, 'strategies': strategies, 'prompt_models': args.prompt_models,
+        'questions': [question_id for question_id, _ in questions], 'options': args.options, 'user': args.user
+    })
+
+    runner = ExperimentRunner(mpe.Session, mpe.lookups, generate, checkpoint, user=args.user,
+                              concurrency=args.concurrency, order_models=mpe.model_scheduler.order_models,
+                              retries=args.retries)
+    try:
+        runner.run(runner.plan(questions, models, strategies, args.prompt_models))
+    finally:
+        mpe.ollama_client.close()
+        mpe.generation_cache.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Response cache for deterministic LLM generations.
+Entries are keyed by model, system prompt, prompt and sampling options and
+evicted least recently used first once the cache exceeds its size limit.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+def is_deterministic(options):
+    """Generations are only cacheable with a fixed seed or temperature 0"""
+    if not options:
+        return False
+    return options.get('seed') is not None or options.get('temperature') == 0
+
+
+class GenerationCache:
+    """SQLite store for generated responses and their token counts"""
+
+    def __init__(self, path="generation_cache.db", max_bytes=256 * 1024**2):
+        """
+        Args:
+            path: SQLite file of the cache
+            max_bytes: Upper bound for the stored response text
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS generations ("
+            "key TEXT PRIMARY KEY, response TEXT, prompt_eval_count INTEGER, "
+            "eval_count INTEGER, size INTEGER, last_used REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_generations_last_used ON generations (last_used)")
+        self._conn.commit()
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    @staticmethod
+    def make_key(model, system_prompt, prompt, options):
+        raw = json.dumps([model, (system_prompt or '').strip(), prompt, options or {}], sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return the cached {response, prompt_eval_count, eval_count} or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, prompt_eval_count, eval_count FROM generations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            self._conn.execute("UPDATE generations SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.stats['hits'] += 1
+            return {'response': row[0], 'prompt_eval_count': row[1], 'eval_count': row[2]}
+
+    def put(self, key, response, prompt_eval_count, eval_count):
+        size = len(response.encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO generations VALUES (?, ?, ?, ?, ?, ?)",
+                (key, response, prompt_eval_count, eval_count, size, time.time())
+            )
+            self.stats['stores'] += 1
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM generations").fetchone()[0]
+        while total > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT key, size FROM generations ORDER BY last_used ASC LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._conn.execute("DELETE FROM generations WHERE key = ?", (row[0],))
+            self.stats['evictions'] += 1
+            total -= row[1]
+
+    def get_stats(self):
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM generations"
+            ).fetchone()
+            return {**self.stats, 'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
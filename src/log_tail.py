@@ -0,0 +1,82 @@
+"""
+Byte-offset based reading of growing log files.
+Clients pass the offset they have read up to and only receive the bytes
+written since, capped to a window, so following a log costs O(new data).
+"""
+import os
+import time
+
+
+def _complete_utf8(data):
+    """Length of data without a trailing, incomplete UTF-8 sequence"""
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte & 0xC0 != 0x80:  # Lead byte or ASCII
+            needed = 1 if byte < 0x80 else 2 if byte >> 5 == 0b110 else 3 if byte >> 4 == 0b1110 else 4
+            return len(data) - back if needed > back else len(data)
+    return len(data)
+
+
+def read_tail(path, offset=None, max_bytes=64 * 1024):
+    """
+    Read the bytes written after `offset`.
+
+    Args:
+        path: Log file
+        offset: Byte offset the client has read up to (None = last window of the file)
+        max_bytes: Maximum number of bytes returned
+
+    Returns:
+        dict: {offset, next_offset, size, data, skipped, reset}. `skipped` is
+        the number of bytes left out to stay within the window, `reset` is
+        True if the file shrank (truncated or replaced) since `offset`.
+    """
+    size = os.path.getsize(path)
+    reset = offset is not None and offset > size
+    if offset is None or reset:
+        offset = 0
+    skipped = max(0, size - offset - max_bytes)
+    offset += skipped
+
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(size - offset)
+
+    if skipped:
+        # Jumped into the middle of the file: start at the next full line
+        start = data.find(b'\n') + 1
+        if 0 < start < len(data):
+            skipped += start
+            offset += start
+            data = data[start:]
+    # A multi-byte character still being written is sent with the next read
+    data = data[:_complete_utf8(data)]
+
+    return {
+        'offset': offset,
+        'next_offset': offset + len(data),
+        'size': size,
+        'data': data.decode('utf-8', errors='replace'),
+        'skipped': skipped,
+        'reset': reset,
+    }
+
+
+def follow(path, offset=None, max_bytes=64 * 1024, poll_interval=1.0, heartbeat=15.0):
+    """
+    Yield read_tail() chunks as the file grows, and None as a heartbeat
+    when nothing was written for `heartbeat` seconds.
+    """
+    last_sent = time.monotonic()
+    while True:
+        if os.path.exists(path) and (offset is None or os.path.getsize(path) != offset):
+            chunk = read_tail(path, offset, max_bytes)
+            if chunk['data'] or chunk['reset'] or offset is None:
+                offset = chunk['next_offset']
+                last_sent = time.monotonic()
+                yield chunk
+                continue
+        if time.monotonic() - last_sent > heartbeat:
+            last_sent = time.monotonic()
+            yield None
+        time.sleep(poll_interval)
@@ -0,0 +1,97 @@
+"""
+In-memory registry for the lookup tables.
+Models, strategies and questions only change when the database is
+initialized or migrated, so their ids are loaded once and served from
+memory. Write paths resolve names and ids here instead of querying the
+database for every answer.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from db_models import Model, Strategy, Question
+
+QuestionInfo = namedtuple('QuestionInfo', ['id', 'question', 'correct_answer'])
+
+
+class LookupRegistry:
+    """Read-mostly maps of model, strategy and question rows"""
+
+    def __init__(self, session_factory, min_reload_interval=5.0):
+        """
+        Args:
+            session_factory: Callable returning a SQLAlchemy session
+            min_reload_interval: Seconds between reloads caused by unknown keys
+        """
+        self.session_factory = session_factory
+        self.min_reload_interval = min_reload_interval
+        self._lock = threading.Lock()
+        self._snapshot = None  # Replaced as a whole, readers never see a partial load
+        self._loaded_at = 0.0
+        self._stats = {'hits': 0, 'misses': 0, 'reloads': 0}
+
+    def load(self):
+        """(Re)load all lookup tables from the database"""
+        session = self.session_factory()
+        try:
+            models = {name: id for id, name in session.query(Model.id, Model.name)}
+            strategies = {name: id for id, name in session.query(Strategy.id, Strategy.name)}
+            questions = {
+                row.id: QuestionInfo(row.id, row.question, row.correct_answer)
+                for row in session.query(Question.id, Question.question, Question.correct_answer)
+            }
+        finally:
+            session.close()
+
+        snapshot = {
+            'models': models,
+            'strategies': strategies,
+            'questions': questions,
+            'question_ids': {info.question: id for id, info in questions.items()},
+        }
+        with self._lock:
+            self._snapshot = snapshot
+            self._loaded_at = time.monotonic()
+            self._stats['reloads'] += 1
+        return snapshot
+
+    def invalidate(self):
+        """Drop the loaded tables; the next lookup reloads them"""
+        with self._lock:
+            self._snapshot = None
+
+    def _lookup(self, table, key):
+        snapshot = self._snapshot or self.load()
+        value = snapshot[table].get(key)
+        if value is None and time.monotonic() - self._loaded_at > self.min_reload_interval:
+            # Rows added by another process since the last load
+            value = self.load()[table].get(key)
+        with self._lock:
+            self._stats['hits' if value is not None else 'misses'] += 1
+        return value
+
+    def model_id(self, name):
+        return self._lookup('models', name)
+
+    def strategy_id(self, name):
+        return self._lookup('strategies', name)
+
+    def question(self, question_id):
+        """QuestionInfo for an id, or None"""
+        return self._lookup('questions', question_id)
+
+    def question_by_text(self, text):
+        """QuestionInfo for the question text, or None"""
+        question_id = self._lookup('question_ids', text)
+        return None if question_id is None else self.question(question_id)
+
+    def get_stats(self):
+        with self._lock:
+            snapshot = self._snapshot or {}
+            return {
+                **self._stats,
+                'loaded': bool(snapshot),
+                'models': len(snapshot.get('models', ())),
+                'strategies': len(snapshot.get('strategies', ())),
+                'questions': len(snapshot.get('questions', ())),
+            }
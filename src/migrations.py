@@ -0,0 +1,90 @@
+"""
+Versioned schema migrations for the SQLite database.
+The schema version is kept in SQLite's user_version pragma. Every migration
+is idempotent, so it also runs cleanly on databases that create_all() has
+just created with the current schema.
+"""
+from sqlalchemy import inspect, text
+
+import answer_stats
+
+
+def _add_column(connection, table, column, column_type):
+    existing = {col['name'] for col in inspect(connection).get_columns(table)}
+    if column not in existing:
+        connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}'))
+        print(f"Added column {table}.{column}")
+
+
+def _create_index(connection, name, table, columns, unique=False):
+    connection.execute(text(
+        f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS {name} ON {table} ({", ".join(columns)})'
+    ))
+
+
+def migrate_answer_and_query_columns(connection):
+    _add_column(connection, 'answers', 'time_to_first_token', 'FLOAT')
+    _add_column(connection, 'answers', 'cached', 'BOOLEAN')
+    _add_column(connection, 'queries', 'answer_count', 'INTEGER')
+
+    # Backfill the per-query answer counter for rows created before it existed
+    connection.execute(text(
+        'UPDATE queries SET answer_count = '
+        '(SELECT COUNT(*) FROM answers WHERE answers.query_id = queries.id) '
+        'WHERE answer_count IS NULL'
+    ))
+
+
+def migrate_query_keyset_index(connection):
+    _create_index(connection, 'ix_queries_timestamp_id', 'queries', ['timestamp', 'id'])
+
+
+def migrate_lookup_indexes(connection):
+    _create_index(connection, 'ux_questions_question', 'questions', ['question'], unique=True)
+    _create_index(connection, 'ux_models_name', 'models', ['name'], unique=True)
+    _create_index(connection, 'ux_strategies_name', 'strategies', ['name'], unique=True)
+    _create_index(connection, 'ix_answers_query_id', 'answers', ['query_id'])
+    _create_index(connection, 'ix_metaprompts_answer_id', 'metaprompts', ['answer_id'])
+    _create_index(connection, 'ix_queries_user', 'queries', ['user'])
+
+
+def migrate_answer_stats(connection):
+    # The table itself is created by create_all(); fill it from the existing answers
+    answer_stats.rebuild(connection)
+
+
+# (version, description, function) in the order they have to be applied
+MIGRATIONS = [
+    (1, 'answer timing/cache columns and query answer counter', migrate_answer_and_query_columns),
+    (2, 'keyset pagination index on queries', migrate_query_keyset_index),
+    (3, 'indexes and unique constraints for lookup columns', migrate_lookup_indexes),
+    (4, 'aggregate table for /api/stats', migrate_answer_stats),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(connection):
+    return connection.execute(text('PRAGMA user_version')).scalar()
+
+
+def upgrade(engine):
+    """
+    Apply all pending migrations, each in its own transaction.
+
+    Returns:
+        int: Schema version after the upgrade
+    """
+    with engine.connect() as connection:
+        version = get_version(connection)
+
+    for target, description, migration in MIGRATIONS:
+        if target <= version:
+            continue
+        with engine.begin() as connection:
+            migration(connection)
+            connection.execute(text(f'PRAGMA user_version = {int(target)}'))
+        print(f"Migrated database to version {target}: {description}")
+        version = target
+
+    return version
@@ -0,0 +1,209 @@
+"""
+Model residency scheduler for Ollama.
+Tracks which models are loaded (via /api/ps) and loads and unloads them through
+keep_alive requests within a memory budget. Jobs that don't fit wait until the
+models in use are released. Within one request (a strategy batch or an
+experiment run), jobs for resident models are started first to save swaps;
+jobs of different requests are not reordered.
+"""
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class ModelScheduler:
+    """LRU residency manager for Ollama models"""
+
+    def __init__(self, client, memory_budget=None, keep_alive='30m'):
+        """
+        Args:
+            client: OllamaClient used for the API calls
+            memory_budget: Bytes available for loaded models (None = unlimited)
+            keep_alive: keep_alive value sent with loads and generations
+        """
+        self.client = client
+        self.memory_budget = memory_budget
+        self.keep_alive = keep_alive
+
+        self._loaded = OrderedDict()  # model -> size in bytes, least recently used first
+        self._active = {}             # model -> number of running jobs
+        self._sizes = {}              # model -> known or estimated size in bytes
+        self._cond = threading.Condition()
+        self._fetch_lock = threading.Lock()  # Serializes /api/tags lookups, never taken under _cond
+        self._stats = {'loads': 0, 'unloads': 0, 'waits': 0}
+
+    def refresh(self):
+        """Synchronize the resident set with Ollama's /api/ps and the model sizes with /api/tags"""
+        try:
+            response = self.client.get('/api/ps', timeout=10)
+            response.raise_for_status()
+            running = {m['name']: m.get('size', 0) for m in response.json().get('models', [])}
+        except Exception as e:
+            print(f"Error fetching running models from Ollama: {e}")
+            return False
+        sizes = self._fetch_sizes()
+
+        with self._cond:
+            self._sizes.update(sizes)
+            for model in list(self._loaded):
+                if model not in running and not self._active.get(model):
+                    del self._loaded[model]
+            for model, size in running.items():
+                self._sizes[model] = size
+                is_new = model not in self._loaded
+                self._loaded[model] = size
+                if is_new:
+                    self._loaded.move_to_end(model, last=False)
+            self._cond.notify_all()
+        return True
+
+    def _fetch_sizes(self):
+        """Sizes of the installed models from /api/tags (never called with the lock held)"""
+        try:
+            response = self.client.get('/api/tags', timeout=10)
+            response.raise_for_status()
+            return {entry['name']: entry.get('size', 0) for entry in response.json().get('models', [])}
+        except Exception as e:
+            print(f"Error fetching model sizes from Ollama: {e}")
+            return {}
+
+    def _ensure_size(self, model):
+        """Look up an unknown model's size before taking the lock; a miss is cached as 0"""
+        with self._cond:
+            if model in self._sizes:
+                return
+        # Concurrent lookups share one request; jobs for known models are not held up
+        with self._fetch_lock:
+            with self._cond:
+                if model in self._sizes:
+                    return
+            sizes = self._fetch_sizes()
+            with self._cond:
+                for name, size in sizes.items():
+                    self._sizes.setdefault(name, size)
+                self._sizes.setdefault(model, 0)
+
+    def _size_of(self, model):
+        # Sizes are fetched outside the lock (refresh/_ensure_size), so this never blocks
+        return self._sizes.get(model, 0)
+
+    def _can_run(self, model):
+        if model in self._loaded or self.memory_budget is None:
+            return True
+        if not any(self._active.values()):
+            return True  # Nothing in use: always admit, even if the model exceeds the budget
+        free = self.memory_budget - sum(self._loaded.values())
+        evictable = sum(size for name, size in self._loaded.items() if not self._active.get(name))
+        return self._size_of(model) <= free + evictable
+
+    def _make_room(self, model):
+        """Pick least recently used idle models to unload (caller holds the lock)"""
+        if self.memory_budget is None:
+            return []
+        needed = self._size_of(model)
+        evicted = []
+        for name in list(self._loaded):
+            if sum(self._loaded.values()) + needed <= self.memory_budget:
+                break
+            if not self._active.get(name):
+                evicted.append(name)
+                del self._loaded[name]
+        return evicted
+
+    @contextmanager
+    def use(self, model):
+        """
+        Reserve a model for a job, loading it (and evicting others) if needed.
+        Blocks while the model does not fit next to models that are in use.
+        """
+        self._ensure_size(model)
+        with self._cond:
+            if not self._can_run(model):
+                self._stats['waits'] += 1
+                self._cond.wait_for(lambda: self._can_run(model))
+            self._active[model] = self._active.get(model, 0) + 1
+            needs_load = model not in self._loaded
+            evicted = self._make_room(model) if needs_load else []
+            self._loaded[model] = self._size_of(model)
+            self._loaded.move_to_end(model)
+
+        try:
+            for name in evicted:
+                self._unload(name)
+            if needs_load:
+                self._load(model)
+            yield
+        finally:
+            with self._cond:
+                self._active[model] -= 1
+                self._cond.notify_all()
+
+    def preload(self, models):
+        """
+        Load models that fit into the budget without evicting models in use.
+
+        Returns:
+            list: Models that are resident afterwards
+        """
+        resident = []
+        for model in models:
+            self._ensure_size(model)
+            with self._cond:
+                if model in self._loaded:
+                    self._loaded.move_to_end(model)
+                    resident.append(model)
+                    continue
+                if not self._can_run(model):
+                    continue
+                evicted = self._make_room(model)
+                self._loaded[model] = self._size_of(model)
+
+            for name in evicted:
+                self._unload(name)
+            if self._load(model):
+                resident.append(model)
+        return resident
+
+    def order_models(self, models):
+        """
+        Sort the models of one request so resident ones (most recently used
+        first) come before the rest. Only the caller's submission order is
+        affected; waiting jobs from other requests are not reordered.
+        """
+        with self._cond:
+            recency = {name: i for i, name in enumerate(reversed(self._loaded))}
+        return sorted(models, key=lambda m: recency.get(m, len(recency)))
+
+    def _load(self, model):
+        try:
+            response = self.client.post('/api/generate', json={'model': model, 'keep_alive': self.keep_alive})
+            response.raise_for_status()
+            with self._cond:
+                self._stats['loads'] += 1
+            return True
+        except Exception as e:
+            print(f"Error loading model {model}: {e}")
+            with self._cond:
+                self._loaded.pop(model, None)
+                self._cond.notify_all()
+            return False
+
+    def _unload(self, model):
+        try:
+            response = self.client.post('/api/generate', json={'model': model, 'keep_alive': 0})
+            response.raise_for_status()
+            with self._cond:
+                self._stats['unloads'] += 1
+        except Exception as e:
+            print(f"Error unloading model {model}: {e}")
+
+    def status(self):
+        with self._cond:
+            return {
+                'loaded': list(self._loaded),
+                'active': {name: count for name, count in self._active.items() if count},
+                'used_bytes': sum(self._loaded.values()),
+                'memory_budget': self.memory_budget,
+                'keep_alive': self.keep_alive,
+                **self._stats
+            }
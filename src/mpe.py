@@ -1,24 +1,43 @@
-from flask import Flask, render_template, jsonify, request as flask_request  # Renamed to avoid confusion
+from flask import Flask, Response, render_template, jsonify, stream_with_context, request as flask_request  # Renamed to avoid confusion
 import os
+import json
+import hashlib
+import gzip
+import queue
+import threading
+import atexit
 import subprocess
 import requests 
 
-from sqlalchemy import create_engine, func, literal
+from sqlalchemy import func, literal, or_, type_coerce, String
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from sqlalchemy.orm import sessionmaker, aliased
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import time
 
-import pandas as pd
-import numpy as np
-
-from dataset import filter_truthfulqa_data
+from answer_stats import GROUP_FIELDS, METRICS, leaderboard, record_metrics
+from bulk_writes import BatchValidationError, QueryNotFoundError, insert_answers, insert_feedback_entries
+from custom_query import CustomQueryExecutor, QueryLimits
+from data_export import DEFAULT_CHUNK_SIZE as EXPORT_CHUNK_SIZE, FORMATS as EXPORT_FORMATS, stream_export
+from database import create_engines
+from dataset import load_truthfulqa_data
+import migrations
 from db_models import Base, User, Model, Strategy, Question, QuestionCounter, Query, Answer, Feedback, Metaprompt
 
-from globals import MODELS, META_PROMPTING_MODELS_ONLY, QA_PAIRS, QUESTION_COUNTERS, STRATEGIES
+from globals import MODELS, META_PROMPTING_MODELS_ONLY, QA_PAIRS, STRATEGIES
 from pathlib import Path
 
-from bert_score import score as bert_score
+from generation_cache import GenerationCache, is_deterministic
+from log_tail import follow, read_tail
+from lookups import LookupRegistry
+from question_counters import QuestionCounterStore
+from strategies import STRATEGY_NAMES, SharedGenerations, run_strategy, shared_metaprompt_keys
+from user_index import UserIndex
+from model_scheduler import ModelScheduler
+from ollama_client import OllamaClient
+from scoring import ScoreCache, ReferenceEmbeddingStore, ScoringService, ScoringQueue
 from transformers import logging
 
 
@@ -37,12 +56,47 @@ ollama_sif_path = src_dir / "sifs" / "ollama.sif"
 # Suppress warnings from BERTScore
 logging.set_verbosity_error() 
 
+# BERTScore configuration
+BERT_SCORE_THREADS = int(os.environ.get('MPE_BERT_SCORE_THREADS', 0)) or None  # None = torch default
+SCORE_CACHE_PATH = 'score_cache.db'  # SQLite file for cached BERTScore results
+REFERENCE_EMBEDDINGS_PATH = 'reference_embeddings'  # float16 .npy sidecar files per reference answer
+score_cache = ScoreCache(SCORE_CACHE_PATH, max_memory_entries=10000)
+reference_store = ReferenceEmbeddingStore(REFERENCE_EMBEDDINGS_PATH)
+scoring_service = ScoringService(lang="en", num_threads=BERT_SCORE_THREADS,
+                                 cache=score_cache, reference_store=reference_store)
+
 # Database configuration
 DATABASE_URL = 'sqlite:///mpe_database.db'  # SQLite database file
-engine = create_engine(DATABASE_URL, echo=False)  # echo=True for SQL debugging
+DATABASE_READ_POOL_SIZE = 8
+# WAL mode; all writes share one connection, reads use a separate query-only pool
+engine, read_engine = create_engines(DATABASE_URL, read_pool_size=DATABASE_READ_POOL_SIZE, echo=False)  # echo=True for SQL debugging
 Session = sessionmaker(bind=engine)
-
-filtered_data = filter_truthfulqa_data(pd)
+ReadSession = sessionmaker(bind=read_engine)
+# Model, strategy and question ids, reloaded by init_database()
+lookups = LookupRegistry(ReadSession)
+# Per-user question counters, loaded by load_qa_pairs_from_db()
+question_counters = QuestionCounterStore()
+# Autocompletion for /api/users, built on first use and updated when users are created
+user_index = UserIndex(ReadSession)
+USER_SUGGESTION_LIMIT = 10
+USER_SUGGESTION_MAX = 50
+
+# Limits for /api/custom_query (runs on its own read-only connection)
+CUSTOM_QUERY_MAX_ROWS = 10000
+CUSTOM_QUERY_MAX_BYTES = 20 * 1024**2
+CUSTOM_QUERY_TIMEOUT = 10.0  # seconds
+custom_query_executor = CustomQueryExecutor(engine.url.database, QueryLimits(
+    max_rows=CUSTOM_QUERY_MAX_ROWS,
+    max_bytes=CUSTOM_QUERY_MAX_BYTES,
+    timeout=CUSTOM_QUERY_TIMEOUT
+))
+
+# Background scoring: answers are inserted unscored and filled in by the worker
+SCORING_MAX_BATCH_SIZE = 16
+SCORING_MAX_WAIT = 0.5  # seconds
+scoring_queue = ScoringQueue(scoring_service, Session,
+                             max_batch_size=SCORING_MAX_BATCH_SIZE,
+                             max_wait=SCORING_MAX_WAIT)
 
 # Apptainer configuration
 INSTANCE_NAME = 'ollama_instance'
@@ -50,7 +104,47 @@ INSTANCE_NAME = 'ollama_instance'
 # Ollama configuration
 OLLAMA_BASE_URL = 'http://localhost:11434'  # Default Ollama URL
 DEFAULT_MODEL = MODELS[0]  # Default model to use if none specified
-current_model = 'none'
+PROMPT_BATCH_MAX_WORKERS = 4  # Number of generations running concurrently (also the model preload workers)
+prompt_executor = ThreadPoolExecutor(max_workers=PROMPT_BATCH_MAX_WORKERS)
+# Strategy pipelines wait on their stages, generations are limited by the slots
+STRATEGY_MAX_PIPELINES = 16
+STREAM_IDLE_TIMEOUT = 600  # seconds without any event before a generation stream gives up
+strategy_executor = ThreadPoolExecutor(max_workers=STRATEGY_MAX_PIPELINES)
+generation_slots = threading.BoundedSemaphore(PROMPT_BATCH_MAX_WORKERS)
+OLLAMA_CONNECT_TIMEOUT = 3.0  # seconds
+OLLAMA_READ_TIMEOUT = 600.0  # seconds without data before a generation is given up
+OLLAMA_POOL_TIMEOUT = 60.0  # seconds to wait for a free pooled connection
+OLLAMA_RETRIES = 3  # retries when Ollama can't be reached, with exponential backoff
+ollama_client = OllamaClient(OLLAMA_BASE_URL,
+                             pool_size=PROMPT_BATCH_MAX_WORKERS * 2,
+                             pool_timeout=OLLAMA_POOL_TIMEOUT,
+                             connect_timeout=OLLAMA_CONNECT_TIMEOUT,
+                             read_timeout=OLLAMA_READ_TIMEOUT,
+                             retries=OLLAMA_RETRIES)
+# Generation cache: only used when the options make sampling deterministic (seed or temperature 0)
+GENERATION_OPTIONS = {}  # Ollama options sent with every generation, e.g. {'seed': 42, 'temperature': 0}
+GENERATION_CACHE_PATH = 'generation_cache.db'
+GENERATION_CACHE_MAX_BYTES = 256 * 1024**2
+generation_cache = GenerationCache(GENERATION_CACHE_PATH, max_bytes=GENERATION_CACHE_MAX_BYTES)
+OLLAMA_MEMORY_BUDGET_GB = float(os.environ.get('MPE_OLLAMA_MEMORY_BUDGET_GB', 0)) or None  # None = unlimited
+OLLAMA_KEEP_ALIVE = '30m'  # How long Ollama keeps a model after its last use
+model_scheduler = ModelScheduler(ollama_client,
+                                 memory_budget=OLLAMA_MEMORY_BUDGET_GB and int(OLLAMA_MEMORY_BUDGET_GB * 1024**3),
+                                 keep_alive=OLLAMA_KEEP_ALIVE)
+
+# Pagination of /api/queries
+QUERY_PAGE_SIZE = 50
+QUERY_PAGE_MAX = 200
+
+# Log viewer: maximum bytes returned per /api/logs request or SSE chunk
+LOG_WINDOW_BYTES = 256 * 1024
+LOG_WINDOW_MAX = 4 * 1024**2
+LOG_POLL_INTERVAL = 1.0  # seconds between size checks while following a log
+LOG_GZIP_MIN_BYTES = 1024  # smaller responses are not worth compressing
+
+# Serialized /api/config payload and its version (built on first use)
+STATIC_CONFIG = None
+CONFIG_MAX_AGE = 365 * 24 * 3600  # seconds, for versioned /api/config requests
 
 # Timestamp
 RUN_TIMESTAMP=datetime.now().strftime("%Y_%m_%d@%H_%M_%S")
@@ -62,32 +156,132 @@ def index():
 
 @app.route('/api/config')
 def get_config():
+    """
+    Static configuration (models, strategies, QA pairs), cached by the browser.
+    Pages request it as /api/config?v=<version>, which is cached for a year;
+    plain requests are revalidated with the ETag. Counters are served by
+    /api/question_counters.
+    """
+    body, version = get_static_config()
+    if flask_request.if_none_match.contains(version):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(version)
+    if flask_request.args.get('v') == version:
+        response.headers['Cache-Control'] = f'public, max-age={CONFIG_MAX_AGE}, immutable'
+    else:
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def get_static_config():
+    """Serialized static config and its content hash, rebuilt after load_qa_pairs_from_db()"""
+    global STATIC_CONFIG
+    if STATIC_CONFIG is None:
+        body = json.dumps({
+            'models': MODELS,
+            'meta_models': META_PROMPTING_MODELS_ONLY,
+            'qa_pairs': QA_PAIRS,
+            'strategies': STRATEGIES
+        }, separators=(',', ':')).encode('utf-8')
+        STATIC_CONFIG = (body, hashlib.sha256(body).hexdigest()[:16])
+    return STATIC_CONFIG
+
+@app.context_processor
+def inject_config_version():
+    return {'config_version': get_static_config()[1]}
+
+def question_counter_map(counters):
+    """Group (question_id, user, count) rows as {question text: [{user, count}]} for the frontend"""
+    grouped = {}
+    for question_id, user, count in counters:
+        question = lookups.question(question_id)
+        if question:
+            grouped.setdefault(question.question, []).append({'user': user, 'count': count})
+    return grouped
+
+@app.route('/api/question_counters')
+def get_question_counters():
+    """Counters changed since the client's last sync (?since=<version>&epoch=<epoch>)"""
+    since = flask_request.args.get('since', type=int)
+    epoch = flask_request.args.get('epoch')
+    version, full, changed = question_counters.changes_since(since, epoch)
     return jsonify({
-        'models': MODELS,
-        'meta_models': META_PROMPTING_MODELS_ONLY,
-        'qa_pairs': QA_PAIRS,
-        'question_counters': QUESTION_COUNTERS,
-        'strategies': STRATEGIES
+        'epoch': question_counters.epoch,
+        'version': version,
+        'config_version': get_static_config()[1],
+        'full': full,
+        'counters': question_counter_map(changed)
     })
 
+def get_log_files():
+    """Log files of this run: name -> (path, title)"""
+    return {
+        'output': (log_path / f"service_output@{RUN_TIMESTAMP}.log", 'Service Output'),
+        'boot': (log_path / f"service_boot@{RUN_TIMESTAMP}.log", 'Service Boot'),
+    }
+
 @app.route('/logs')
 def show_logs():
-    service_output_path = log_path / f"service_output@{RUN_TIMESTAMP}.log"
-    service_boot_path = log_path / f"service_boot@{RUN_TIMESTAMP}.log"
-
+    # Contents are loaded incrementally from /api/logs/<name> by logs.js
     logs = {
-        'output': {'path': service_output_path, 'content': '', 'title': 'Service Output'},
-        'boot': {'path': service_boot_path, 'content': '', 'title': 'Service Boot'}
+        key: {'path': str(path), 'title': title}
+        for key, (path, title) in get_log_files().items()
     }
+    return render_template('logs.html', active_tab='logs', logs=logs, timestamp=RUN_TIMESTAMP)
 
-    for key in logs:
-        try:
-            with open(logs[key]['path'], 'r') as f:
-                logs[key]['content'] = f.read()
-        except FileNotFoundError:
-            logs[key]['content'] = f"Log file not found: {logs[key]['path']}"
+def get_log_window():
+    return min(max(flask_request.args.get('max_bytes', LOG_WINDOW_BYTES, type=int), 1), LOG_WINDOW_MAX)
 
-    return render_template('logs.html', active_tab='logs', logs=logs, timestamp=RUN_TIMESTAMP)
+@app.route('/api/logs/<name>')
+def get_log_tail(name):
+    """
+    Bytes of a log file after ?offset= (the previous next_offset).
+    Without an offset the last window of the file is returned.
+    """
+    log_files = get_log_files()
+    if name not in log_files:
+        return jsonify({'error': f'Unknown log: {name}'}), 404
+    path = log_files[name][0]
+    if not path.exists():
+        return jsonify({'error': f'Log file not found: {path}'}), 404
+
+    chunk = read_tail(path, flask_request.args.get('offset', type=int), get_log_window())
+    body = json.dumps(chunk).encode('utf-8')
+
+    response = Response(body, mimetype='application/json')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    if len(body) >= LOG_GZIP_MIN_BYTES and 'gzip' in flask_request.accept_encodings:
+        response.set_data(gzip.compress(body, compresslevel=5))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+@app.route('/api/logs/<name>/stream')
+def stream_log(name):
+    """
+    Follow a log file as server-sent events, starting at ?offset=
+    Emits:
+    - chunk: the /api/logs/<name> fields for every batch of new bytes
+    - a comment line as heartbeat while nothing is written
+    """
+    log_files = get_log_files()
+    if name not in log_files:
+        return jsonify({'error': f'Unknown log: {name}'}), 404
+
+    chunks = follow(log_files[name][0], flask_request.args.get('offset', type=int),
+                    max_bytes=get_log_window(), poll_interval=LOG_POLL_INTERVAL)
+
+    def event_stream():
+        yield ": connected\n\n"  # Sends the headers before the first chunk is available
+        for chunk in chunks:
+            if chunk is None:
+                yield ": heartbeat\n\n"
+            else:
+                yield f"event: chunk\ndata: {json.dumps(chunk)}\n\n"
+
+    return Response(stream_with_context(event_stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/users', methods=['GET', 'POST'])
 def handle_users():
@@ -107,15 +301,17 @@ def insert_query():
         return jsonify({'error': 'Missing required fields: user, question_text'}), 400
 
     try:
-        question = session.query(Question).filter_by(question=query_data['question_text']).first()
+        question = lookups.question_by_text(query_data['question_text'])
         if not question:
             return jsonify({
                     'message': 'Operation aborted',
                     'reason': 'Question not found - no entries were processed'
                 }), 200 
         
-        if not session.query(User).filter_by(user=query_data['user']).first():
-            create_user()
+        # Created in this session: a nested session would wait for the single writer connection
+        new_user = session.query(User).filter_by(user=query_data['user']).first() is None
+        if new_user:
+            session.add(User(user=query_data['user']))
         
         new_query = Query(
             user=query_data['user'],
@@ -125,39 +321,20 @@ def insert_query():
 
         session.add(new_query)
         
-        # Update or create QuestionCounter entry
-        question_counter = session.query(QuestionCounter).filter_by(
-            user=query_data['user'],
-            question_id=question.id
-        ).first()
-        
-        if question_counter:
-            question_counter.count += 1
-        else:
-            question_counter = QuestionCounter(
-                user=query_data['user'],
-                question_id=question.id,
-                count=1
+        # Update or create QuestionCounter entry in a single upsert
+        session.execute(
+            sqlite_insert(QuestionCounter)
+            .values(user=query_data['user'], question_id=question.id, count=1)
+            .on_conflict_do_update(
+                index_elements=[QuestionCounter.user, QuestionCounter.question_id],
+                set_={'count': QuestionCounter.count + 1}
             )
-            session.add(question_counter)      
+        )
 
         session.commit()
-
-        # Update global QUESTION_COUNTERS variable
-        if question.question not in QUESTION_COUNTERS:
-            QUESTION_COUNTERS[question.question] = []
-        
-        # Find or create user entry for this question
-        user_entry = next((entry for entry in QUESTION_COUNTERS[question.question] 
-                         if entry["user"] == query_data['user']), None)
-        
-        if user_entry:
-            user_entry["count"] += 1
-        else:
-            QUESTION_COUNTERS[question.question].append({
-                "user": query_data['user'],
-                "count": 1
-            })
+        question_counters.increment(question.id, query_data['user'])
+        if new_user:
+            user_index.add(query_data['user'])
 
         return jsonify({
             'message': 'Query created successfully',
@@ -179,125 +356,103 @@ def insert_query():
 def insert_answer():
     """Create new answers in the database and optionally create metaprompts"""
     data = flask_request.json
-    session = Session()
 
-    if 'answers' not in data:
+    if not data or 'answers' not in data:
         return jsonify({'error': 'Missing "answers" list'}), 400
 
-    responses = []
-
+    session = Session()
     try:
-        for answer_data in data['answers']:
-            required_fields = ['answer', 'model', 'user', 'strategy', 'query_id']
-            if not all(field in answer_data for field in required_fields):
-                return jsonify({'error': f'Missing fields in one of the answers: {answer_data}'}), 400
-
-            # 1. Find the query by ID
-            query = session.query(Query).filter_by(
-                id=answer_data['query_id'],
-                user=answer_data['user']
-            ).first()
-            
-            if not query:
-                return jsonify({
-                    'message': 'Operation aborted',
-                    'reason': 'Query not found - no entries were processed'
-                }), 200 
-
-            # 2. Find the model by name
-            model = session.query(Model).filter_by(
-                name=answer_data['model']
-            ).first()
-            if not model:
-                continue
-
-            question = session.query(Question).filter_by(id=query.question_id).first()
-            bScore = get_bert_score(answer_data['answer'], question.correct_answer)
-            
-            # 3. Create new answer
-            new_answer = Answer(
-                answer=answer_data['answer'],
-                model=model.id,
-                query_id=query.id,
-                position=answer_data.get('position', 0),
-                response_time=answer_data.get('response_time', 0.0),
-                precision=bScore["Precision"],
-                recall=bScore["Recall"],
-                f1=bScore["F1"],
-                # Add token information
-                prompt_eval_count=answer_data.get('tokens', {}).get('prompt_eval_count', 0),
-                eval_count=answer_data.get('tokens', {}).get('eval_count', 0),
-                total_tokens=answer_data.get('tokens', {}).get('total_tokens', 0)
-            )
+        responses, to_score = insert_answers(session, lookups, data['answers'])
+        session.commit()
 
-            session.add(new_answer)
-            session.flush()
-
-            # 4. Optional meta prompt creation
-            metaprompt_id = None
-            if ('metaprompt_data' in answer_data and 
-                answer_data['metaprompt_data'] is not None and
-                answer_data['strategy'] != 'none'):
-                
-                metaprompt_data = answer_data['metaprompt_data']
-                
-                # Validate metaprompt required fields
-                metaprompt_required = ['strategy_name', 'metaPrompt', 'prompt_model']
-                if all(field in metaprompt_data for field in metaprompt_required):
-                    
-                    # Find strategy
-                    strategy = session.query(Strategy).filter_by(
-                        name=metaprompt_data['strategy_name']
-                    ).first()
-                    
-                    # Find prompt model
-                    prompt_model = session.query(Model).filter_by(
-                        name=metaprompt_data['prompt_model']
-                    ).first()
-                    
-                    if strategy and prompt_model:
-                        # Create Metaprompt
-                        new_metaprompt = Metaprompt(
-                            query_id=query.id,
-                            strategy_id=strategy.id,
-                            model_id=prompt_model.id,
-                            prompt=metaprompt_data['metaPrompt'],
-                            answer_id=new_answer.id,
-                            # Token information for metaprompt (if available)
-                            prompt_eval_count=metaprompt_data.get('tokens', {}).get('prompt_eval_count', 0),
-                            eval_count=metaprompt_data.get('tokens', {}).get('eval_count', 0),
-                            total_tokens=metaprompt_data.get('tokens', {}).get('total_tokens', 0)
-                        )
-                        session.add(new_metaprompt)
-                        session.flush()
-                        metaprompt_id = new_metaprompt.id
-
-            responses.append({
-                'answer_id': new_answer.id,
-                'query_id': query.id,
-                'model': model.name,
-                'strategy': answer_data['strategy'],
-                'metaprompt_id': metaprompt_id,
-                'prompt_model': answer_data.get('metaprompt_data', {}).get('prompt_model') if answer_data.get('metaprompt_data') else None,
-                'tokens': {
-                    'prompt_eval_count': new_answer.prompt_eval_count,
-                    'eval_count': new_answer.eval_count,
-                    'total_tokens': new_answer.total_tokens
-                }
-            })
+        for answer_id, query_id, answer_text, reference in to_score:
+            scoring_queue.submit(answer_id, query_id, answer_text, reference)
 
-        session.commit()
         return jsonify({
             'message': 'Answers and metaprompts created successfully',
             'results': responses
         }), 201
 
+    except BatchValidationError as e:
+        session.rollback()
+        return jsonify({'error': str(e), 'errors': e.errors}), 400
+    except QueryNotFoundError:
+        session.rollback()
+        return jsonify({
+            'message': 'Operation aborted',
+            'reason': 'Query not found - no entries were processed'
+        }), 200
     except Exception as e:
         session.rollback()
         return jsonify({'error': 'Failed to create answers/metaprompts', 'details': str(e)}), 500
     finally:
         session.close()
 
+@app.route('/api/scoring_status/<int:query_id>')
+def get_scoring_status(query_id):
+    """Report how many answers of a query have been scored by the background queue"""
+    session = ReadSession()
+    try:
+        total, scored = session.query(
+            func.count(Answer.id),
+            func.count(Answer.f1)
+        ).filter(Answer.query_id == query_id).one()
+
+        return jsonify({
+            'query_id': query_id,
+            'total': total,
+            'scored': scored,
+            'queued': scoring_queue.pending(query_id),
+            'done': total == scored
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        session.close()
+
+@app.route('/api/stats')
+def get_stats():
+    """
+    Leaderboard of models and strategies from the pre-aggregated answer_stats table.
+    Query parameters:
+    - group_by: Comma-separated subset of model,strategy,category (default: all, empty: overall)
+    - metrics: Comma-separated metric names (default: all)
+    - model, strategy, category: Optional filters
+    Every metric comes with n, mean, std and a 95% confidence interval.
+    """
+    group_by = flask_request.args.get('group_by', ','.join(GROUP_FIELDS))
+    group_by = [field for field in group_by.split(',') if field]
+    metrics = [metric for metric in flask_request.args.get('metrics', '').split(',') if metric]
+
+    unknown = [field for field in group_by if field not in GROUP_FIELDS]
+    unknown += [metric for metric in metrics if metric not in METRICS]
+    if unknown:
+        return jsonify({
+            'error': f"Unknown fields or metrics: {', '.join(unknown)}",
+            'group_by': GROUP_FIELDS,
+            'metrics': list(METRICS)
+        }), 400
+
+    filters = {field: flask_request.args[field] for field in GROUP_FIELDS if flask_request.args.get(field)}
+    session = ReadSession()
+    try:
+        return jsonify({
+            'group_by': group_by,
+            'filters': filters,
+            'groups': leaderboard(session, group_by, metrics, filters)
+        })
+    finally:
+        session.close()
+
+@app.route('/api/lookups/stats')
+def get_lookup_stats():
+    return jsonify(lookups.get_stats())
+
+@app.route('/api/score_cache/stats')
+def get_score_cache_stats():
+    """Hit/miss counters of the BERTScore result cache"""
+    return jsonify(score_cache.get_stats())
+
 @app.route('/api/insert_bestAnswer', methods=['POST'])
 def insert_bestAnswer():
     session = Session()
@@ -335,6 +490,10 @@ def insert_bestAnswer():
 
         # Update the best answer
         query.best_answer_id = best_answer_id
+        session.flush()
+        # Every answer of the query takes part in the vote (win or loss)
+        record_metrics(session, [row[0] for row in session.query(Answer.id).filter_by(query_id=query_id)],
+                       ['best_answer'])
         session.commit()
 
         return jsonify({
@@ -358,13 +517,13 @@ def get_annotated_answer():
     if not query_id:
         return jsonify({'error': 'query_id is required'}), 400   
 
-    session = Session()
+    session = ReadSession()
     try:        
         query = session.query(Query).filter_by(id=query_id).first()
         if not query:
             return jsonify({'error': 'Query not found'}), 404            
       
-        question = session.query(Question).filter_by(id=query.question_id).first()
+        question = lookups.question(query.question_id)
         if not question:
             return jsonify({'error': 'Question not found'}), 404
             
@@ -381,7 +540,6 @@ def get_annotated_answer():
 def insert_feedback():
     """Create multiple feedback entries from provided list"""
     data = flask_request.json
-    session = Session()
 
     if not data or 'feedback_entries' not in data:
         return jsonify({'error': 'Missing "feedback_entries" list'}), 400
@@ -390,64 +548,10 @@ def insert_feedback():
     if not isinstance(feedback_entries, list):
         return jsonify({'error': 'Expected a list of feedback entries'}), 400
 
-    responses = []
-    errors = []
-
+    session = Session()
     try:
-        for idx, entry in enumerate(feedback_entries):
-            try:
-                # Check required fields
-                required_fields = ['answer_id', 'user', 'completeness', 'relevance', 'clarity']
-                if not all(field in entry for field in required_fields):
-                    errors.append({'index': idx, 'error': 'Missing required fields'})
-                    continue
-
-                # Verify user exists
-                user = session.query(User).filter_by(user=entry['user']).first()
-                if not user:
-                    errors.append({'index': idx, 'error': 'User not found'})
-                    continue
-
-                # Verify answer exists
-                answer = session.query(Answer).filter_by(id=entry['answer_id']).first()
-                if not answer:
-                    errors.append({'index': idx, 'error': 'Answer not found'})
-                    continue
-
-                existing_feedback = answer.feedback_id
-                
-                if existing_feedback:
-                    errors.append({'index': idx, 'error': 'Feedback already exists for this answer'})
-                    continue
-
-                # Create new feedback entry
-                new_feedback = Feedback(
-                    user=entry['user'],                
-                    completeness=float(entry['completeness']),
-                    relevance=float(entry['relevance']),
-                    clarity=float(entry['clarity'])
-                )
-
-                session.add(new_feedback)
-                session.flush()  # To get ID before commit
-
-                # Update answer to link to feedback
-                answer.feedback_id = new_feedback.id
-
-                responses.append({
-                    'feedback_id': new_feedback.id,
-                    'answer_id': entry['answer_id'],
-                    'user': entry['user'],
-                    'status': 'created',
-                    'index': idx
-                })
-
-            except ValueError as e:
-                errors.append({'index': idx, 'error': f'Invalid numeric value: {str(e)}'})
-            except Exception as e:
-                errors.append({'index': idx, 'error': str(e)})
-
-        # Commit all changes if no critical errors
+        # Invalid entries are reported per index, all valid ones are written together
+        responses, errors = insert_feedback_entries(session, feedback_entries)
         session.commit()
 
         return jsonify({
@@ -469,12 +573,14 @@ def handle_prompt():
     Accepts JSON with:
     - prompt: The text prompt to send to the LLM (required)
     - model: Optional model name (defaults to DEFAULT_MODEL)
+    - options: Optional Ollama options (merged over GENERATION_OPTIONS)
     Returns JSON response with:
     - prompt: The original prompt
     - model: The model used
     - response: The LLM's response
     - response_time: Time taken for the request
     - tokens: Token usage information
+    - cached: True if the response came from the generation cache
     - error: Present if there was an error
     """
     # Get JSON data from request
@@ -488,52 +594,281 @@ def handle_prompt():
     prompt = data['prompt']
     model = data.get('model', DEFAULT_MODEL)
     system_prompt = data.get('systemPrompt', '')
+    options = data.get('options')
     
+    return jsonify(timed_generate(prompt, model, system_prompt, options))
+
+def timed_generate(prompt, model=None, system_prompt='', options=None):
+    """Run generate_response and return the /api/prompt response body"""
+    model = model or DEFAULT_MODEL
+
     # Get response from Ollama with timing
     start_time = time.time()
-    response_data = generate_response(prompt, model, system_prompt)
+    response_data = generate_response(prompt, model, system_prompt, options)
     end_time = time.time()
-    
-    # Calculate response time
-    response_time = end_time - start_time
-    
-    return jsonify({
+
+    return {
         'prompt': prompt,
         'model': model,
         'systemPrompt': system_prompt,
         'response': response_data.get('response', ''),
-        'response_time': response_time,
+        'response_time': end_time - start_time,
         'tokens': {
             'prompt_eval_count': response_data.get('prompt_eval_count', 0),
             'eval_count': response_data.get('eval_count', 0),
             'total_tokens': response_data.get('total_tokens', 0)
-        }
-    })
+        },
+        'cached': response_data.get('cached', False),
+        'error': response_data.get('error')
+    }
+
+def stream_until_done(events, count, error_result):
+    """
+    Yield queued (event, payload) pairs as server-sent events until every
+    index 0..count-1 got its done event.
+    :param events: Queue filled by the generation workers
+    :param count: Number of indices that have to finish
+    :param error_result: Callable (index, message) returning the done payload of a failed index
+    """
+    pending = set(range(count))
+    while pending:
+        try:
+            event, payload = events.get(timeout=STREAM_IDLE_TIMEOUT)
+        except queue.Empty:
+            # A worker died without reporting: finish the stream instead of hanging
+            for index in sorted(pending):
+                payload = error_result(index, "Error: no response from the generation worker")
+                yield f"event: done\ndata: {json.dumps(payload)}\n\n"
+            return
+        if event == 'done':
+            if payload['index'] not in pending:
+                continue
+            pending.discard(payload['index'])
+        yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def stream_generate(prompt, model=None, system_prompt='', options=None, on_token=None):
+    """
+    Stream a prompt through Ollama's NDJSON API.
+    :param prompt: The input prompt/text to send to the model
+    :param model: The model to use (default from config)
+    :param system_prompt: Optional system prompt
+    :param options: Optional Ollama options (merged over GENERATION_OPTIONS)
+    :param on_token: Optional callback receiving every generated text chunk
+    :return: Dictionary with the /api/prompt fields plus time_to_first_token
+    """
+    model = model or DEFAULT_MODEL
+    options = {**GENERATION_OPTIONS, **(options or {})}
+    start_time = time.time()
+
+    cache_key = None
+    if is_deterministic(options):
+        cache_key = GenerationCache.make_key(model, system_prompt, prompt, options)
+        cached = generation_cache.get(cache_key)
+        if cached:
+            if on_token:
+                on_token(cached['response'])
+            return {
+                'prompt': prompt,
+                'model': model,
+                'systemPrompt': system_prompt,
+                'response': cached['response'],
+                'response_time': time.time() - start_time,
+                'time_to_first_token': time.time() - start_time,
+                'tokens': {
+                    'prompt_eval_count': cached['prompt_eval_count'],
+                    'eval_count': cached['eval_count'],
+                    'total_tokens': cached['prompt_eval_count'] + cached['eval_count']
+                },
+                'cached': True
+            }
+
+    payload = {
+        "model": model,
+        "prompt": prompt,
+        "stream": True,
+        "think": False,
+        "keep_alive": model_scheduler.keep_alive
+    }
+
+    if system_prompt and system_prompt.strip():
+        payload["system"] = system_prompt.strip()
+    if options:
+        payload["options"] = options
+
+    chunks = []
+    final = {}
+    time_to_first_token = None
+    error = None
+
+    try:
+        with ollama_client.post('/api/generate', json=payload, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                token = chunk.get('response', '')
+                if token:
+                    if time_to_first_token is None:
+                        time_to_first_token = time.time() - start_time
+                    chunks.append(token)
+                    if on_token:
+                        on_token(token)
+                if chunk.get('done'):
+                    final = chunk
+    except requests.exceptions.RequestException as e:
+        chunks = [f"Error communicating with Ollama: {str(e)}"]
+        error = str(e)
+
+    prompt_tokens = final.get('prompt_eval_count', 0)
+    completion_tokens = final.get('eval_count', 0)
+
+    if cache_key and final:
+        generation_cache.put(cache_key, ''.join(chunks), prompt_tokens, completion_tokens)
+
+    return {
+        'prompt': prompt,
+        'model': model,
+        'systemPrompt': system_prompt,
+        'response': ''.join(chunks) or 'No response received',
+        'response_time': time.time() - start_time,
+        'time_to_first_token': time_to_first_token,
+        'tokens': {
+            'prompt_eval_count': prompt_tokens,
+            'eval_count': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        },
+        'cached': False,
+        'error': error
+    }
 
-def generate_response(prompt, model=None, system_prompt=''):
+@app.route('/api/strategy_stream', methods=['POST'])
+def handle_strategy_stream():
+    """
+    Run the strategy pipelines of all output boxes for one prompt server-side
+    and stream the answers as server-sent events.
+    Accepts JSON {prompt, boxes: [{outputModel, promptModel, strategy}], options}
+    Boxes run concurrently; each box starts its next stage as soon as its
+    previous stage is done, independent of the other boxes. Intermediate
+    generations (meta-prompts, C-Reference baselines) that several boxes
+    need are generated once and shared.
+    Emits:
+    - token: {index, token} for every chunk of a box's answer
+    - done: {index, ...} with the /insert_answer fields of the box
+    """
+    data = flask_request.get_json()
+    if not data or not data.get('prompt') or not isinstance(data.get('boxes'), list):
+        return jsonify({'error': 'Please provide a "prompt" and a "boxes" list'}), 400
+
+    boxes = data['boxes']
+    for box in boxes:
+        if not isinstance(box, dict) or box.get('strategy') not in STRATEGY_NAMES or not box.get('outputModel'):
+            return jsonify({'error': f'Invalid box: {box}'}), 400
+        if box['strategy'] != 'none' and not box.get('promptModel'):
+            return jsonify({'error': f'Strategy {box["strategy"]} needs a promptModel'}), 400
+
+    prompt = data['prompt']
+    options = data.get('options')
+    events = queue.Queue()
+    shared = SharedGenerations()
+    shared_keys = shared_metaprompt_keys([(box['strategy'], box.get('promptModel')) for box in boxes])
+
+    def error_result(index, message):
+        box = boxes[index]
+        return {'index': index, 'answer': message, 'model': box['outputModel'], 'strategy': box['strategy'],
+                'response_time': 0, 'time_to_first_token': None, 'cached': False,
+                'tokens': {'prompt_eval_count': 0, 'eval_count': 0, 'total_tokens': 0},
+                'metaprompt_data': None}
+
+    def run_box(index, box):
+        def timed(stage_prompt, model, system_prompt):
+            with generation_slots, model_scheduler.use(model):
+                return timed_generate(stage_prompt, model, system_prompt, options)
+
+        def generate(stage_prompt, model, system_prompt, final):
+            if final:
+                with generation_slots, model_scheduler.use(model):
+                    return stream_generate(stage_prompt, model, system_prompt, options,
+                                           on_token=lambda token: events.put(('token', {'index': index, 'token': token})))
+            # Waiting for another box's generation doesn't hold a generation slot
+            return shared.run((stage_prompt, model, system_prompt),
+                              lambda: timed(stage_prompt, model, system_prompt))
+
+        result = None
+        try:
+            result = run_strategy(box['strategy'], prompt, box['outputModel'], box.get('promptModel'), generate)
+            if (box['strategy'], box.get('promptModel')) in shared_keys:
+                # insert_answer splits the tokens of one generation across the boxes sharing it
+                result['metaprompt_data']['shared'] = True
+            result = {'index': index, **result}
+        except Exception as e:
+            result = error_result(index, f"Error: {str(e)}")
+        finally:
+            # Every box gets its done event, or the client would wait forever
+            events.put(('done', result or error_result(index, "Error: generation was aborted")))
+
+    # Boxes of resident models first
+    ranked = model_scheduler.order_models(list(dict.fromkeys(box['outputModel'] for box in boxes)))
+    for index in sorted(range(len(boxes)), key=lambda i: ranked.index(boxes[i]['outputModel'])):
+        strategy_executor.submit(run_box, index, boxes[index])
+
+    return Response(stream_with_context(stream_until_done(events, len(boxes), error_result)),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/generation_cache/stats')
+def get_generation_cache_stats():
+    """Hit/miss counters and size of the generation cache"""
+    return jsonify(generation_cache.get_stats())
+
+@app.route('/api/ollama/stats')
+def get_ollama_stats():
+    """Connection pool usage and latency of the shared Ollama client"""
+    return jsonify(ollama_client.get_stats())
+
+def generate_response(prompt, model=None, system_prompt='', options=None):
     """
     Send a prompt to the LLM and get the response.
+    Deterministic generations (fixed seed or temperature 0) are served from
+    the generation cache when possible.
     :param prompt: The input prompt/text to send to the model
     :param model: The model to use (default from config)
     :param system_prompt: Optional system prompt
+    :param options: Optional Ollama options (merged over GENERATION_OPTIONS)
     :return: Dictionary with response and token information
     """
     model = model or DEFAULT_MODEL
-    endpoint = f"{OLLAMA_BASE_URL}/api/generate"
+    options = {**GENERATION_OPTIONS, **(options or {})}
+
+    cache_key = None
+    if is_deterministic(options):
+        cache_key = GenerationCache.make_key(model, system_prompt, prompt, options)
+        cached = generation_cache.get(cache_key)
+        if cached:
+            return {
+                'response': cached['response'],
+                'prompt_eval_count': cached['prompt_eval_count'],
+                'eval_count': cached['eval_count'],
+                'total_tokens': cached['prompt_eval_count'] + cached['eval_count'],
+                'cached': True
+            }
     
     payload = {
         "model": model,
         "prompt": prompt,
         "stream": False,
-        "think": False
+        "think": False,
+        "keep_alive": model_scheduler.keep_alive
     }
     
     # Add system prompt if provided and not empty
     if system_prompt and system_prompt.strip():
         payload["system"] = system_prompt.strip()
+    if options:
+        payload["options"] = options
     
     try:
-        response = requests.post(endpoint, json=payload)
+        response = ollama_client.post('/api/generate', json=payload)
         response.raise_for_status()  # Raise exception for HTTP errors
         
         response_json = response.json()
@@ -542,12 +877,16 @@ def generate_response(prompt, model=None, system_prompt=''):
         prompt_tokens = response_json.get('prompt_eval_count', 0)
         completion_tokens = response_json.get('eval_count', 0)
         total_tokens = prompt_tokens + completion_tokens
+
+        if cache_key and 'response' in response_json:
+            generation_cache.put(cache_key, response_json['response'], prompt_tokens, completion_tokens)
         
         return {
             'response': response_json.get('response', 'No response received'),
             'prompt_eval_count': prompt_tokens,
             'eval_count': completion_tokens,
-            'total_tokens': total_tokens
+            'total_tokens': total_tokens,
+            'cached': False
         }
         
     except requests.exceptions.RequestException as e:
@@ -555,7 +894,8 @@ def generate_response(prompt, model=None, system_prompt=''):
             'response': f"Error communicating with Ollama: {str(e)}",
             'prompt_eval_count': 0,
             'eval_count': 0,
-            'total_tokens': 0
+            'total_tokens': 0,
+            'error': str(e)
         }
     
 def init_database():
@@ -564,6 +904,7 @@ def init_database():
     try:
         # Create all tables based on the models
         Base.metadata.create_all(engine)
+        migrations.upgrade(engine)
         print("Database tables created successfully!")       
 
         session = Session()
@@ -585,12 +926,10 @@ def init_database():
                 strategy = Strategy(name=strategy_name)
                 session.add(strategy)
         
-        # Questions
-        print("Adding questions...")
-        for _, row in filtered_data.iterrows():
-            # Check if question already exists
-            existing_question = session.query(Question).filter_by(question=row['Question']).first()
-            if not existing_question:
+        # Questions (the dataset is only loaded while the table is still empty)
+        if session.query(Question.id).first() is None:
+            print("Adding questions...")
+            for row in load_truthfulqa_data():
                 question = Question(
                     type=row['Type'],
                     category=row['Category'],
@@ -602,6 +941,8 @@ def init_database():
         
         # Commit all changes
         session.commit()
+        lookups.invalidate()
+        lookups.load()
         print("Database initialization complete!")
         
     except Exception as e:
@@ -613,22 +954,27 @@ def init_database():
         if session:
             session.close()
 
+def precompute_reference_embeddings():
+    """Encode the reference answers of all questions once, so scoring only encodes answers"""
+    session = ReadSession()
+    try:
+        references = [row[0] for row in session.query(Question.correct_answer).all() if row[0]]
+    finally:
+        session.close()
+
+    count = scoring_service.precompute_references(references)
+    print(f"Precomputed reference embeddings for {count} questions")
+
 def get_user_suggestions():
-    """Get all users filtered by the query parameter"""
-    filter_text = flask_request.args.get('filter', '').lower()
-    session = Session()
+    """Get the best matching users for the filter text (prefix matches first)"""
+    filter_text = flask_request.args.get('filter', '')
+    limit = min(max(flask_request.args.get('limit', USER_SUGGESTION_LIMIT, type=int), 1), USER_SUGGESTION_MAX)
     
     try:
-        # Get all users that contain the filter text
-        users = session.query(User.user).filter(User.user.ilike(f'%{filter_text}%')).all()
-        # Convert list of tuples to list of strings
-        user_list = [user[0] for user in users]
-        return jsonify(user_list)
+        return jsonify(user_index.search(filter_text, limit=limit))
     except Exception as e:
         print(f"Error fetching user suggestions: {e}")
         return jsonify([])
-    finally:
-        session.close()
 
 def create_user():
     """Create a new user in the database"""
@@ -652,6 +998,7 @@ def create_user():
         new_user = User(user=username)
         session.add(new_user)
         session.commit()
+        user_index.add(username)
         return jsonify({'message': 'User created successfully'}), 201
     except Exception as e:
         session.rollback()
@@ -665,39 +1012,25 @@ def load_qa_pairs_from_db():
     Load all questions and their correct answers from the database
     into the global QA_PAIRS variable.
     """
-    global QA_PAIRS, QUESTION_COUNTERS
+    global QA_PAIRS, STATIC_CONFIG
     session = None
     
     try:
-        session = Session()
+        session = ReadSession()
         
         # 1. Load QA pairs
         questions = session.query(Question.question, Question.correct_answer).all()  
         QA_PAIRS = tuple((str(q.question), str(q.correct_answer)) for q in questions)
+        STATIC_CONFIG = None  # New config version
         
         # 2. Load question counters
-        question_data = session.query(
-            Question.question,
+        question_counters.load(session.query(
+            QuestionCounter.question_id,
             QuestionCounter.user,
             QuestionCounter.count
-        ).outerjoin(
-            QuestionCounter, Question.id == QuestionCounter.question_id
-        ).all()
+        ).all())
         
-        for question_text, user, count in question_data:
-            if not question_text:
-                continue
-                
-            if question_text not in QUESTION_COUNTERS:
-                QUESTION_COUNTERS[question_text] = []
-            
-            if user and count is not None:  # Only add if counter exists
-                QUESTION_COUNTERS[question_text].append({
-                    "user": user,
-                    "count": count
-                })
-        
-        print(f"Loaded {len(QA_PAIRS)} QA pairs and counters for {len(QUESTION_COUNTERS)} questions")
+        print(f"Loaded {len(QA_PAIRS)} QA pairs and {len(question_counters)} question counters")
         return True
         
     except Exception as e:
@@ -710,7 +1043,7 @@ def load_qa_pairs_from_db():
 def get_installed_models():
     """Get all models installed in Ollama"""
     try:        
-        response = requests.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=10)
+        response = ollama_client.get('/api/tags', timeout=10)
         response.raise_for_status()
         
         data = response.json()
@@ -750,7 +1083,7 @@ def wait_for_ollama(max_retries=30, check_interval=0.5):
     for attempt in range(max_retries):
         # Check connection
         try:
-            response = requests.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=3)
+            response = ollama_client.get('/api/tags', timeout=3, retries=0)
             if response.ok:
                 print("\nOllama ready!" + " "*20)  
                 return True
@@ -778,6 +1111,7 @@ def start_service():
         subprocess.run(cmd, shell=True, check=True)
         
         wait_for_ollama()
+        model_scheduler.refresh()
         
         # Check missing models
         installed_models = get_installed_models()
@@ -795,80 +1129,112 @@ def start_service():
         print(f"Unexpected error: {e}")
         return False
 
-def switch_model(new_model):
-    """
-    Switch to new model.
-    
-    Args:
-        new_model: Model to switch to
-    
-    Returns:
-        bool: True if successful, False otherwise
-    """
-    if current_model == new_model:
-        return True
-    
-    try:
-        # ollama run implies ollama pull if the requested model is not available
-        if current_model == 'none':
-            cmd = f'apptainer exec instance://{INSTANCE_NAME} ollama run {new_model}'
-        else:
-            cmd = (f'apptainer exec instance://{INSTANCE_NAME} ollama stop {current_model} && '
-                   f'apptainer exec instance://{INSTANCE_NAME} ollama run {new_model}')
-        
-        result = subprocess.run(cmd, shell=True, check=True)
-        return result.returncode
-    except subprocess.CalledProcessError as e:
-        print(f"Error while switching models: {e}")
-        return False
-    except Exception as e:
-        print(f"Unexpected error: {e}")
-        return False
+@app.route('/api/models/status')
+def get_models_status():
+    """Models currently resident in Ollama and the scheduler counters"""
+    model_scheduler.refresh()
+    return jsonify(model_scheduler.status())
 
-def crude_switch_model(new_model):
-    if current_model == new_model:
-        pass
-    elif current_model == 'none':
-        os.system(f'apptainer exec instance://{INSTANCE_NAME} ollama run {new_model}')
-    else:
-        os.system(f'apptainer exec instance://{INSTANCE_NAME} ollama stop {current_model} && apptainer exec instance://{INSTANCE_NAME} ollama run {new_model}')
+@app.route('/api/models/preload', methods=['POST'])
+def preload_models():
+    """Load the models the next batch needs, as far as the memory budget allows"""
+    data = flask_request.get_json()
+    if not data or not isinstance(data.get('models'), list):
+        return jsonify({'error': 'Missing "models" list'}), 400
+
+    models = [model for model in data['models'] if model in MODELS]
+    prompt_executor.submit(model_scheduler.preload, models)
+    return jsonify({'message': 'Preloading started', 'models': models}), 202
 
 @app.route('/table', methods=("POST", "GET"))
 def html_table():
-    """Display a master table of all queries with essential information."""
-    query_data = pd.read_sql_query("""
-    SELECT
-        q.id as QueryID,
-        u.user as User,
-        q.timestamp as Timestamp,
-        quest.question as Question,
-        COUNT(a.id) as AnswerCount
-    FROM queries q
-    JOIN users u ON q.user = u.user
-    JOIN questions quest ON q.question_id = quest.id
-    LEFT JOIN answers a ON q.id = a.query_id
-    GROUP BY q.id, u.user, q.timestamp, quest.question
-    ORDER BY q.timestamp ASC
-    """, engine.connect())
-    
-    # Convert to list of dictionaries and combine user:queryID
-    rows = []
-    for _, row in query_data.iterrows():
-        row_dict = row.to_dict()
-        row_dict['UserQueryID'] = f"{row_dict['User']}:{row_dict['QueryID']}"
-        rows.append(row_dict)
-    
+    """Display the master table of queries; rows are loaded page by page from /api/queries"""
+    session = ReadSession()
+    try:
+        questions = session.query(Question.id, Question.question).order_by(Question.id).all()
+    finally:
+        session.close()
+
     columns = ['UserQueryID', 'Timestamp', 'Question', 'AnswerCount']
     
     return render_template('table.html',
                          column_names=columns,
-                         row_data=rows,
+                         questions=questions,
+                         page_size=QUERY_PAGE_SIZE,
                          active_tab='table')
 
+@app.route('/api/queries')
+def get_queries():
+    """
+    Keyset-paginated list of queries ordered by (timestamp, id)
+    Query parameters:
+    - limit: Page size (default QUERY_PAGE_SIZE, clamped to 1..QUERY_PAGE_MAX)
+    - cursor: next_cursor of the previous page
+    - user: Only queries of this user
+    - question_id: Only queries for this question
+    Returns JSON with rows and next_cursor (None on the last page)
+    """
+    try:
+        limit = min(max(flask_request.args.get('limit', QUERY_PAGE_SIZE, type=int), 1), QUERY_PAGE_MAX)
+        question_id = flask_request.args.get('question_id', type=int)
+        cursor = flask_request.args.get('cursor')
+        after = None
+        if cursor:
+            after_timestamp, after_id = cursor.rsplit('|', 1)
+            after = (after_timestamp, int(after_id))
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    user = flask_request.args.get('user')
+
+    # Compare timestamps as stored text, so the cursor matches SQLite's format exactly
+    timestamp = type_coerce(Query.timestamp, String)
+
+    session = ReadSession()
+    try:
+        query = session.query(
+            Query.id,
+            Query.user,
+            timestamp.label('timestamp'),
+            Question.question,
+            Query.answer_count
+        ).join(Question, Query.question_id == Question.id)
+
+        if user:
+            query = query.filter(Query.user == user)
+        if question_id is not None:
+            query = query.filter(Query.question_id == question_id)
+        if after:
+            query = query.filter(or_(
+                timestamp > after[0],
+                (timestamp == after[0]) & (Query.id > after[1])
+            ))
+
+        rows = query.order_by(Query.timestamp, Query.id).limit(limit + 1).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        return jsonify({
+            'rows': [{
+                'QueryID': row.id,
+                'User': row.user,
+                'UserQueryID': f"{row.user}:{row.id}",
+                'Timestamp': row.timestamp,
+                'Question': row.question,
+                'AnswerCount': row.answer_count or 0
+            } for row in rows],
+            'next_cursor': f"{rows[-1].timestamp}|{rows[-1].id}" if has_more else None
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        session.close()
+
 @app.route('/api/query_answers/<int:query_id>')
 def get_query_answers(query_id):
     """Get all answers for a specific query with related information"""
-    session = Session()
+    session = ReadSession()
     try:
         # Get the query to check for best answer
         query = session.query(Query).filter_by(id=query_id).first()
@@ -938,9 +1304,42 @@ def get_query_answers(query_id):
     finally:
         session.close()
 
+@app.route('/api/export')
+def export_answers():
+    """
+    Stream the answer-level dataset (query, question, answer, metaprompt,
+    feedback, scores and tokens) as a file download, written chunk by chunk.
+    Query parameters:
+    - format: 'parquet' (default) or 'arrow' (Arrow IPC stream)
+    - chunk_size: Answers per row group / record batch
+    """
+    export_format = flask_request.args.get('format', 'parquet')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unknown format, expected one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    chunk_size = flask_request.args.get('chunk_size', EXPORT_CHUNK_SIZE, type=int)
+    if chunk_size <= 0:
+        return jsonify({'error': 'chunk_size has to be positive'}), 400
+
+    def generate():
+        session = ReadSession()
+        try:
+            yield from stream_export(session, export_format, chunk_size)
+        finally:
+            session.close()
+
+    extension, mimetype = EXPORT_FORMATS[export_format]
+    filename = f"mpe_answers_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
 @app.route('/api/custom_query', methods=['POST'])
 def execute_custom_query():
-    """Execute a custom SQL query and return results as JSON"""
+    """
+    Execute a custom SQL query and stream the results as JSON
+    The response has the keys columns, rows, row_count, truncated and query_id;
+    truncated names the limit that cut the result short (max_rows, max_bytes,
+    timeout, cancelled) or is null. The query id is also sent as X-Query-Id.
+    """
     data = flask_request.get_json()
     
     if not data or 'query' not in data:
@@ -955,41 +1354,39 @@ def execute_custom_query():
     if not sql_query.upper().startswith('SELECT'):
         return jsonify({'error': 'Only SELECT statements are allowed'}), 400
     
-    session = Session()
     try:
-        # Execute the query using pandas for easy JSON conversion
-        result_df = pd.read_sql_query(sql_query, engine.connect())
-        
-        # Replace NULL values with "NULL" string
-        result_df = result_df.fillna("NULL")
-        
-        # Convert to list of dictionaries
-        rows = result_df.to_dict('records')
-        columns = list(result_df.columns)
-        
-        return jsonify({
-            'columns': columns,
-            'rows': rows,
-            'row_count': len(rows)
-        }), 200
-        
+        query_id, chunks = custom_query_executor.start(sql_query)
     except Exception as e:
         return jsonify({
             'error': 'Query execution failed',
             'details': str(e)
         }), 400
-    finally:
-        session.close()
 
+    return Response(stream_with_context(chunks), mimetype='application/json',
+                    headers={'X-Query-Id': query_id})
 
+@app.route('/api/custom_query/<query_id>/cancel', methods=['POST'])
+def cancel_custom_query(query_id):
+    """Interrupt a running custom query"""
+    if not custom_query_executor.cancel(query_id):
+        return jsonify({'error': 'Query not running'}), 404
+    return jsonify({'message': 'Query cancelled', 'query_id': query_id}), 200
 
 def get_bert_score(answer: str, truth_answer: str):
-    (P, R, F), hashname = bert_score([answer], [truth_answer], lang="en", return_hash=True, verbose=False)
-    return {"Precision": P, "Recall": R, "F1": F}
+    return scoring_service.score(answer, truth_answer)
 
 if __name__ == '__main__':
     init_database()
     load_qa_pairs_from_db()
+
+    scoring_service.start()
+    precompute_reference_embeddings()
+    atexit.register(scoring_service.shutdown)
+    scoring_queue.start()
+    scoring_queue.requeue_unscored()
+    atexit.register(scoring_queue.shutdown)
+    atexit.register(ollama_client.close)
+    atexit.register(generation_cache.close)
     
     if START_APPTAINER:
         start_service()
@@ -0,0 +1,170 @@
+"""
+Shared HTTP client for the Ollama API.
+Keeps connections alive in a pool sized to the expected concurrency, applies
+pool/connect/read timeouts to every call and retries requests that could not
+connect with backoff. Requests that may have reached Ollama are never sent
+again, so a generation is not run twice.
+"""
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import EmptyPoolError, NewConnectionError
+
+
+class _PoolTimeoutMixin:
+    """Connection pool that waits at most pool_timeout seconds for a free connection"""
+    pool_timeout = None
+
+    def _get_conn(self, timeout=None):
+        # requests never passes a pool timeout to urllib3, so it would wait forever
+        return super()._get_conn(self.pool_timeout if timeout is None else timeout)
+
+
+class _PoolTimeoutAdapter(HTTPAdapter):
+    """HTTPAdapter whose blocking pools give up after pool_timeout seconds"""
+
+    def __init__(self, pool_timeout, **kwargs):
+        self.pool_timeout = pool_timeout
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: type(pool_class.__name__, (_PoolTimeoutMixin, pool_class), {'pool_timeout': self.pool_timeout})
+            for scheme, pool_class in (('http', HTTPConnectionPool), ('https', HTTPSConnectionPool))
+        }
+
+
+def _is_connect_error(error):
+    """True if the request failed while connecting, i.e. Ollama never received it"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class OllamaClient:
+    """requests.Session wrapper with pooling, timeouts, retries and usage stats"""
+
+    def __init__(self, base_url, pool_size=8, pool_timeout=60.0, connect_timeout=3.0, read_timeout=600.0,
+                 retries=3, backoff=0.5):
+        """
+        Args:
+            base_url: Ollama base URL, e.g. http://localhost:11434
+            pool_size: Maximum number of pooled keep-alive connections
+            pool_timeout: Seconds to wait for a free connection when all are in use
+            connect_timeout: Default seconds to establish a connection
+            read_timeout: Default seconds to wait for data (per chunk when streaming)
+            retries: Default number of retries when a connection can't be established
+            backoff: Base delay in seconds, doubled after every retry
+        """
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+
+        self.session = requests.Session()
+        adapter = _PoolTimeoutAdapter(pool_timeout, pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'errors': 0,
+            'retries': 0,
+            'in_flight': 0,
+            'max_in_flight': 0,
+            'total_latency': 0.0,
+            'max_latency': 0.0
+        }
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def request(self, method, path, timeout=None, retries=None, **kwargs):
+        """
+        Send a request to Ollama.
+
+        Args:
+            method: HTTP method
+            path: API path, e.g. /api/generate
+            timeout: Read timeout in seconds or a (connect, read) tuple
+            retries: Retries when a connection can't be established (defaults to the client setting)
+            **kwargs: Passed on to requests.Session.request (json, stream, ...)
+
+        Returns:
+            requests.Response
+
+        Raises:
+            requests.exceptions.RequestException: After the last failed attempt;
+                ConnectionError if no pooled connection became free in time
+        """
+        if timeout is None:
+            timeout = (self.connect_timeout, self.read_timeout)
+        elif not isinstance(timeout, tuple):
+            timeout = (min(self.connect_timeout, timeout), timeout)
+        retries = self.retries if retries is None else retries
+
+        url = f"{self.base_url}{path}"
+        attempt = 0
+        while True:
+            self._begin()
+            start_time = time.time()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+                self._end(time.time() - start_time)
+                return response
+            except EmptyPoolError as e:
+                self._end(time.time() - start_time, error=True)
+                raise requests.exceptions.ConnectionError(
+                    f"No free Ollama connection within {self.pool_timeout}s") from e
+            except requests.exceptions.ConnectionError as e:
+                self._end(time.time() - start_time, error=True)
+                # Anything after the connect phase may already be running in Ollama
+                if attempt >= retries or not _is_connect_error(e):
+                    raise
+                with self._lock:
+                    self._stats['retries'] += 1
+                time.sleep(self.backoff * (2 ** attempt))
+                attempt += 1
+            except requests.exceptions.RequestException:
+                self._end(time.time() - start_time, error=True)
+                raise
+
+    def _begin(self):
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['in_flight'] += 1
+            self._stats['max_in_flight'] = max(self._stats['max_in_flight'], self._stats['in_flight'])
+
+    def _end(self, latency, error=False):
+        with self._lock:
+            self._stats['in_flight'] -= 1
+            self._stats['total_latency'] += latency
+            self._stats['max_latency'] = max(self._stats['max_latency'], latency)
+            if error:
+                self._stats['errors'] += 1
+
+    def get_stats(self):
+        """
+        Pool usage and latency statistics.
+        Latency is measured until the response headers arrive.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['pool_size'] = self.pool_size
+        stats['avg_latency'] = stats['total_latency'] / stats['requests'] if stats['requests'] else 0.0
+        return stats
+
+    def close(self):
+        self.session.close()
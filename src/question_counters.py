@@ -0,0 +1,75 @@
+"""
+In-memory store for how often each user asked each question.
+Counters are keyed by (question_id, user) and versioned, so clients can
+fetch only the counters that changed since their last sync.
+"""
+import threading
+import uuid
+from collections import OrderedDict
+
+
+class QuestionCounterStore:
+    """Thread-safe (question_id, user) -> count map with change tracking"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = OrderedDict()  # (question_id, user) -> (count, version), least recently changed first
+        self._version = 0
+        # Versions restart with the process; clients holding another epoch get a full snapshot
+        self.epoch = uuid.uuid4().hex
+
+    def load(self, rows):
+        """Replace all counters with (question_id, user, count) rows"""
+        with self._lock:
+            self._version += 1
+            self._counts = OrderedDict(
+                ((question_id, user), (count, self._version))
+                for question_id, user, count in rows
+                if count is not None
+            )
+
+    def increment(self, question_id, user, delta=1):
+        """Add delta to a counter and return the new count"""
+        key = (question_id, user)
+        with self._lock:
+            self._version += 1
+            count = self._counts.get(key, (0, 0))[0] + delta
+            self._counts[key] = (count, self._version)
+            self._counts.move_to_end(key)
+            return count
+
+    def get(self, question_id, user):
+        with self._lock:
+            return self._counts.get((question_id, user), (0, 0))[0]
+
+    def snapshot(self):
+        """
+        Returns:
+            tuple: (version, [(question_id, user, count)]) of all counters
+        """
+        version, _, counters = self.changes_since()
+        return version, counters
+
+    def __len__(self):
+        return len(self._counts)
+
+    def changes_since(self, version=None, epoch=None):
+        """
+        Counters changed after a version, or all counters if the version is
+        unknown or from another epoch.
+
+        Returns:
+            tuple: (current version, full snapshot?, [(question_id, user, count)])
+        """
+        with self._lock:
+            if version is None or epoch != self.epoch or version > self._version:
+                return self._version, True, [(q, u, c) for (q, u), (c, _) in self._counts.items()]
+
+            changed = []
+            # Most recently changed entries are at the end, stop at the first older one
+            for (question_id, user), (count, changed_in) in reversed(self._counts.items()):
+                if changed_in <= version:
+                    break
+                changed.append((question_id, user, count))
+            changed.reverse()
+            return self._version, False, changed
@@ -0,0 +1,519 @@
+"""
+Resident BERTScore scorer shared by all requests.
+The model and tokenizer are loaded once and kept in memory, so each score
+only costs a forward pass. Answers are scored in the background by
+ScoringQueue, which batches them and bulk-updates the answers table.
+Results are memoized in ScoreCache, keyed by answer, reference and model hash,
+and reference-side embeddings are kept in ReferenceEmbeddingStore so only the
+candidate answer has to be encoded.
+"""
+import hashlib
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from answer_stats import record_metrics
+from db_models import Answer, Query, Question
+
+
+class ScoreCache:
+    """
+    Content-addressed BERTScore cache with an in-memory LRU tier in front of
+    a SQLite tier. Keys are derived from the normalized answer, the reference
+    answer and the scorer model/version hash.
+    """
+
+    def __init__(self, path="score_cache.db", max_memory_entries=10000):
+        """
+        Args:
+            path: SQLite file for the persistent tier (None disables it)
+            max_memory_entries: Capacity of the in-memory LRU tier
+        """
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0}
+
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS bert_scores ("
+                "key TEXT PRIMARY KEY, precision REAL, recall REAL, f1 REAL)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(answer, reference, model_hash):
+        """Hash of the normalized texts and the scorer hash"""
+        normalized = " ".join((answer or "").split())
+        reference = " ".join((reference or "").split())
+        digest = hashlib.sha256()
+        for part in (normalized, reference, model_hash or ""):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the cached score dict or None"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT precision, recall, f1 FROM bert_scores WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    self.stats['disk_hits'] += 1
+                    result = {"Precision": row[0], "Recall": row[1], "F1": row[2]}
+                    self._remember(key, result)
+                    return result
+
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key, result):
+        with self._lock:
+            self._remember(key, result)
+            self.stats['stores'] += 1
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO bert_scores (key, precision, recall, f1) VALUES (?, ?, ?, ?)",
+                    (key, result["Precision"], result["Recall"], result["F1"])
+                )
+                self._conn.commit()
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_stats(self):
+        with self._lock:
+            hits = self.stats['memory_hits'] + self.stats['disk_hits']
+            lookups = hits + self.stats['misses']
+            disk_entries = 0
+            if self._conn is not None:
+                disk_entries = self._conn.execute("SELECT COUNT(*) FROM bert_scores").fetchone()[0]
+            return {
+                **self.stats,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'disk_entries': disk_entries
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class ReferenceEmbeddingStore:
+    """
+    Sidecar store for reference-side BERTScore embeddings.
+    Each reference is saved as a float16 embedding matrix plus its IDF weights
+    in .npy files, which are memory-mapped on load.
+    """
+
+    def __init__(self, directory="reference_embeddings"):
+        self.directory = Path(directory)
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(reference):
+        return hashlib.sha256((reference or "").encode("utf-8")).hexdigest()
+
+    def _paths(self, reference, model_hash):
+        folder = self.directory / re.sub(r'[^A-Za-z0-9_.-]+', '_', model_hash or 'default')
+        key = self.make_key(reference)
+        return folder / f"{key}.emb.npy", folder / f"{key}.idf.npy"
+
+    def get(self, reference, model_hash):
+        """Return (embedding, idf) arrays or None if not stored yet"""
+        emb_path, idf_path = self._paths(reference, model_hash)
+        with self._lock:
+            if emb_path in self._loaded:
+                return self._loaded[emb_path]
+            if not (emb_path.exists() and idf_path.exists()):
+                return None
+            entry = (np.load(emb_path, mmap_mode='r'), np.load(idf_path, mmap_mode='r'))
+            self._loaded[emb_path] = entry
+            return entry
+
+    def put(self, reference, model_hash, embedding, idf):
+        emb_path, idf_path = self._paths(reference, model_hash)
+        emb_path.parent.mkdir(parents=True, exist_ok=True)
+        np.save(emb_path, np.asarray(embedding, dtype=np.float16))
+        np.save(idf_path, np.asarray(idf, dtype=np.float32))
+        with self._lock:
+            self._loaded.pop(emb_path, None)
+
+
+class ScoringService:
+    """Long-lived wrapper around bert_score.BERTScorer"""
+
+    def __init__(self, lang="en", num_threads=None, warmup=True, cache=None, reference_store=None):
+        """
+        Args:
+            lang: Language used by bert_score to pick the default model
+            num_threads: Number of CPU threads for torch (None keeps the torch default)
+            warmup: Run a dummy forward pass right after loading
+            cache: Optional ScoreCache consulted before scoring
+            reference_store: Optional ReferenceEmbeddingStore with precomputed references
+        """
+        self.cache = cache
+        self.reference_store = reference_store
+        self.lang = lang
+        self.num_threads = num_threads
+        self.warmup = warmup
+        self._scorer = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self._scorer is not None
+
+    @property
+    def hash(self):
+        """Model/version hash as reported by bert_score (None before start)"""
+        return self._scorer.hash if self._scorer else None
+
+    def start(self):
+        """Load tokenizer and model once; safe to call repeatedly"""
+        with self._lock:
+            if self._scorer is not None:
+                return self
+
+            import torch
+            from bert_score import BERTScorer
+
+            if self.num_threads:
+                torch.set_num_threads(self.num_threads)
+
+            print("Loading BERTScore model...")
+            self._scorer = BERTScorer(lang=self.lang)
+
+            if self.warmup:
+                self._scorer.score(["warm-up"], ["warm-up"], verbose=False)
+            print(f"BERTScore ready ({self._scorer.hash})")
+        return self
+
+    def score_batch(self, answers, references):
+        """
+        Score a list of answers against their references in one forward pass.
+
+        Args:
+            answers: List of candidate texts
+            references: List of reference texts (same length as answers)
+
+        Returns:
+            list: One {"Precision", "Recall", "F1"} dict per answer
+        """
+        if not answers:
+            return []
+        if not self.ready:
+            self.start()
+
+        results = [None] * len(answers)
+        keys = [None] * len(answers)
+        missing = []
+        for i, (answer, reference) in enumerate(zip(answers, references)):
+            if self.cache is not None:
+                keys[i] = ScoreCache.make_key(answer, reference, self.hash)
+                results[i] = self.cache.get(keys[i])
+            if results[i] is None:
+                missing.append(i)
+
+        if missing:
+            missing_answers = [answers[i] for i in missing]
+            missing_references = [references[i] for i in missing]
+            with self._lock:
+                if self._can_use_reference_store():
+                    scores = self._score_against_stored(missing_answers, missing_references)
+                else:
+                    P, R, F = self._scorer.score(missing_answers, missing_references, verbose=False)
+                    scores = zip(P.tolist(), R.tolist(), F.tolist())
+
+            for i, (p, r, f) in zip(missing, scores):
+                results[i] = {"Precision": float(p), "Recall": float(r), "F1": float(f)}
+                if self.cache is not None:
+                    self.cache.put(keys[i], results[i])
+
+        return results
+
+    def precompute_references(self, references):
+        """
+        Encode and store reference answers that are not in the store yet.
+
+        Args:
+            references: Iterable of reference texts
+
+        Returns:
+            int: Number of newly encoded references
+        """
+        if self.reference_store is None:
+            return 0
+        if not self.ready:
+            self.start()
+
+        with self._lock:
+            if not self._can_use_reference_store():
+                return 0
+            todo = [ref for ref in dict.fromkeys(references)
+                    if self.reference_store.get(ref, self.hash) is None]
+            for ref, (emb, idf) in zip(todo, self._encode(todo)):
+                self.reference_store.put(ref, self.hash, emb.cpu().numpy(), idf.cpu().numpy())
+        return len(todo)
+
+    def _can_use_reference_store(self):
+        # Stored embeddings hold the last layer only and no baseline rescaling
+        return (self.reference_store is not None
+                and not self._scorer.all_layers
+                and not self._scorer.rescale_with_baseline)
+
+    def _idf_dict(self):
+        """Idf weights as BERTScorer.score uses them (uniform unless idf=True)"""
+        if self._scorer.idf:
+            return self._scorer._idf_dict
+        tokenizer = self._scorer._tokenizer
+        idf_dict = defaultdict(lambda: 1.0)
+        idf_dict[tokenizer.sep_token_id] = 0
+        idf_dict[tokenizer.cls_token_id] = 0
+        return idf_dict
+
+    def _encode(self, texts):
+        """Return one (embedding, idf) pair per text with padding stripped"""
+        if not texts:
+            return []
+        from bert_score.utils import get_bert_embedding
+
+        embedding, mask, idf = get_bert_embedding(
+            list(texts), self._scorer._model, self._scorer._tokenizer, self._idf_dict(),
+            batch_size=self._scorer.batch_size, device=self._scorer.device
+        )
+        lengths = mask.sum(dim=1).tolist()
+        return [(embedding[i, :n], idf[i, :n]) for i, n in enumerate(lengths)]
+
+    def _score_against_stored(self, answers, references):
+        """Greedy cosine matching (as in bert_score) against stored reference embeddings"""
+        import torch
+
+        for ref in dict.fromkeys(references):
+            if self.reference_store.get(ref, self.hash) is None:
+                emb, idf = self._encode([ref])[0]
+                self.reference_store.put(ref, self.hash, emb.cpu().numpy(), idf.cpu().numpy())
+
+        scores = []
+        for (cand_emb, cand_idf), ref in zip(self._encode(answers), references):
+            ref_emb, ref_idf = self.reference_store.get(ref, self.hash)
+            ref_emb = torch.from_numpy(np.array(ref_emb, dtype=np.float32)).to(cand_emb.device)
+            ref_idf = torch.from_numpy(np.array(ref_idf, dtype=np.float32)).to(cand_emb.device)
+            cand_emb = torch.nn.functional.normalize(cand_emb.float(), dim=-1)
+            ref_emb = torch.nn.functional.normalize(ref_emb, dim=-1)
+            cand_idf = cand_idf.float()
+
+            sim = cand_emb @ ref_emb.T
+            precision = (sim.max(dim=1)[0] * cand_idf / cand_idf.sum()).sum().item()
+            recall = (sim.max(dim=0)[0] * ref_idf / ref_idf.sum()).sum().item()
+            f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+            scores.append((precision, recall, f1))
+        return scores
+
+    def score(self, answer, reference):
+        """Score a single answer against its reference"""
+        return self.score_batch([answer], [reference])[0]
+
+    def shutdown(self):
+        """Release model and tokenizer"""
+        with self._lock:
+            if self._scorer is None:
+                return
+            self._scorer = None
+            if self.cache is not None:
+                self.cache.close()
+
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+        print("BERTScore scorer shut down")
+
+
+class ScoringQueue:
+    """
+    Background worker that scores inserted answers in micro-batches and
+    bulk-updates the precision/recall/f1 columns of the answers table.
+    """
+
+    def __init__(self, scorer, session_factory, max_batch_size=16, max_wait=0.5, max_retries=3):
+        """
+        Args:
+            scorer: ScoringService used for the forward passes
+            session_factory: SQLAlchemy sessionmaker for the bulk updates
+            max_batch_size: Maximum number of answers per batch
+            max_wait: Seconds to wait for a batch to fill up after the first item
+            max_retries: How often an answer that failed on its own is queued again
+        """
+        self.scorer = scorer
+        self.session_factory = session_factory
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self._queue = queue.Queue()
+        self._pending = {}  # query_id -> number of queued answers
+        self._attempts = {}  # answer_id -> failed attempts so far (only touched by the worker)
+        self._pending_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="scoring-queue", daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, answer_id, query_id, answer, reference):
+        """Queue a single answer for scoring"""
+        with self._pending_lock:
+            self._pending[query_id] = self._pending.get(query_id, 0) + 1
+        self._queue.put((answer_id, query_id, answer, reference))
+
+    def pending(self, query_id=None):
+        """Number of queued answers, optionally for a single query"""
+        with self._pending_lock:
+            if query_id is None:
+                return sum(self._pending.values())
+            return self._pending.get(query_id, 0)
+
+    def requeue_unscored(self):
+        """Queue all answers without scores, e.g. left over from a previous run"""
+        session = self.session_factory()
+        try:
+            rows = session.query(
+                Answer.id, Answer.query_id, Answer.answer, Question.correct_answer
+            ).join(
+                Query, Answer.query_id == Query.id
+            ).join(
+                Question, Query.question_id == Question.id
+            ).filter(Answer.f1.is_(None)).all()
+        finally:
+            session.close()
+
+        for answer_id, query_id, answer, reference in rows:
+            self.submit(answer_id, query_id, answer or '', reference or '')
+        return len(rows)
+
+    def shutdown(self, timeout=10):
+        """Stop the worker after the current batch"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            requeued = []
+            try:
+                self._process(batch)
+                for answer_id, _, _, _ in batch:
+                    self._attempts.pop(answer_id, None)
+            except Exception as e:
+                print(f"Error scoring batch of {len(batch)} answers: {e}")
+                requeued = self._retry(batch)
+            finally:
+                finished = [item for item in batch if item not in requeued]
+                with self._pending_lock:
+                    for _, query_id, _, _ in finished:
+                        self._pending[query_id] -= 1
+                        if self._pending[query_id] <= 0:
+                            del self._pending[query_id]
+            for item in requeued:
+                self._queue.put(item)
+
+    def _retry(self, batch):
+        """
+        Score the answers of a failed batch one by one, so a single bad answer
+        doesn't lose the others.
+
+        Returns:
+            list: Items that failed again and are queued for another attempt
+        """
+        requeued = []
+        for item in batch:
+            try:
+                if len(batch) > 1:
+                    self._process([item])
+                    self._attempts.pop(item[0], None)
+                    continue
+            except Exception as e:
+                print(f"Error scoring answer {item[0]}: {e}")
+            attempts = self._attempts.get(item[0], 0) + 1
+            if attempts <= self.max_retries:
+                self._attempts[item[0]] = attempts
+                requeued.append(item)
+            else:
+                # Left unscored; requeue_unscored picks it up after a restart
+                self._attempts.pop(item[0], None)
+                print(f"Giving up on scoring answer {item[0]} after {attempts} attempts")
+        return requeued
+
+    def _process(self, batch):
+        scores = self.scorer.score_batch(
+            [item[2] for item in batch],
+            [item[3] for item in batch]
+        )
+
+        session = self.session_factory()
+        try:
+            session.bulk_update_mappings(Answer, [
+                {
+                    'id': answer_id,
+                    'precision': score["Precision"],
+                    'recall': score["Recall"],
+                    'f1': score["F1"]
+                }
+                for (answer_id, _, _, _), score in zip(batch, scores)
+            ])
+            record_metrics(session, [item[0] for item in batch], ['f1'])
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
@@ -39,6 +39,24 @@ function populateDropdown() {
     });
 }
 
+// Ask the server to load the selected models before the next prompt is sent
+function preloadSelectedModels() {
+    const selectedModels = Object.keys(modelSelections).filter(model =>
+        modelSelections[model].output || modelSelections[model].prompt
+    );
+    if (selectedModels.length === 0) return;
+
+    fetch('/api/models/preload', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({ models: selectedModels })
+    }).catch(error => {
+        console.error('Error preloading models:', error);
+    });
+}
+
 document.addEventListener('DOMContentLoaded', function() {
     userInput = document.getElementById('userInput');
     const sendButton = document.getElementById('sendButton');
@@ -49,14 +67,12 @@ document.addEventListener('DOMContentLoaded', function() {
     
    // First load state from localStorage, then config from the server
     loadStateFromLocalStorage().then(() => {
-        // Fetch config from the server
-        fetch('/api/config')
-            .then(response => response.json())
-            .then(data => {
+        // Static config (browser-cached) and the counters changed since the last visit
+        Promise.all([fetchConfig(), syncQuestionCounters()])
+            .then(([data]) => {
                 qaPairs = data.qa_pairs || [];
                 const models = data.models || [];
                 const strategies = data.strategies || [];
-                questionCounters = data.question_counters || {};                
                 
                 populateDropdown(qaPairs);
                 populateStrategyDropdown(strategies);
@@ -173,6 +189,7 @@ document.addEventListener('DOMContentLoaded', function() {
             modelSelections[model][type] = this.checked;
             console.log('Model selections:', modelSelections);           
             debouncedSave();
+            preloadSelectedModels();
             removeAllOutputBoxes();
             createOutputBoxes(); // Update boxes when checkbox changes
         });
@@ -4,6 +4,9 @@ let META_PROMPTING_MODELS_ONLY = [];
 let modelSelections = {};
 let selectedStrategies = new Set();
 let questionCounters = {}
+// Server version of questionCounters, used to fetch only changed counters
+let questionCountersVersion = null;
+let questionCountersEpoch = null;
 
 // Load current user from local storage or set default value
 let currentUser = localStorage.getItem('currentUser') || 'User';
@@ -12,4 +15,20 @@ let currentUser = localStorage.getItem('currentUser') || 'User';
 let outputBoxesContent = {};
 
 // OutputBox counter
-let boxIndex = 0;
\ No newline at end of file
+let boxIndex = 0;
+
+// Static config (models, strategies, QA pairs), fetched once per page.
+// The versioned URL lets the browser serve it from its cache until the content changes.
+let configPromise = null;
+function fetchConfig() {
+    if (!configPromise) {
+        const version = typeof CONFIG_VERSION !== 'undefined' ? CONFIG_VERSION : '';
+        configPromise = fetch(`/api/config?v=${encodeURIComponent(version)}`)
+            .then(response => response.json())
+            .catch(error => {
+                configPromise = null;
+                throw error;
+            });
+    }
+    return configPromise;
+}
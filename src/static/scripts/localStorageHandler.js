@@ -6,6 +6,8 @@ function saveStateToLocalStorage() {
         outputBoxesContent: outputBoxesContent,
         currentUser: currentUser,
         questionCounters: questionCounters,
+        questionCountersVersion: questionCountersVersion,
+        questionCountersEpoch: questionCountersEpoch,
         timestamp: Date.now()
     };
     
@@ -37,6 +39,8 @@ function loadStateFromLocalStorage() {
             }
             if (data.questionCounters) {
                 questionCounters = data.questionCounters;
+                questionCountersVersion = data.questionCountersVersion ?? null;
+                questionCountersEpoch = data.questionCountersEpoch ?? null;
             }
             
             console.log('State loaded from localStorage');
@@ -76,4 +80,40 @@ function incrementUserQuestionCount(questionText) {
     const entry = entries.find(e => e.user === currentUser);
     entry ? entry.count++ : entries.push({user: currentUser, count: 1});
     return true;
-}
\ No newline at end of file
+}
+
+// Merge {question: [{user, count}]} counters into questionCounters
+function applyQuestionCounters(counters) {
+    Object.entries(counters).forEach(([questionText, updates]) => {
+        const entries = questionCounters[questionText] = questionCounters[questionText] || [];
+        updates.forEach(update => {
+            const entry = entries.find(e => e.user === update.user);
+            entry ? entry.count = update.count : entries.push({user: update.user, count: update.count});
+        });
+    });
+}
+
+// Fetch only the counters that changed on the server since the last sync
+async function syncQuestionCounters() {
+    const params = new URLSearchParams();
+    if (questionCountersVersion !== null && questionCountersEpoch) {
+        params.set('since', questionCountersVersion);
+        params.set('epoch', questionCountersEpoch);
+    }
+
+    try {
+        const response = await fetch(`/api/question_counters?${params}`);
+        const data = await response.json();
+        if (data.full) {
+            questionCounters = {};
+        }
+        applyQuestionCounters(data.counters || {});
+        questionCountersVersion = data.version;
+        questionCountersEpoch = data.epoch;
+        debouncedSave();
+        return Object.keys(data.counters || {}).length > 0 || data.full;
+    } catch (error) {
+        console.error('Error syncing question counters:', error);
+        return false;
+    }
+}
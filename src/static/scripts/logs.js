@@ -0,0 +1,59 @@
+// Incremental log viewer: loads the end of each log once, then follows new bytes via SSE
+const LOG_VIEW_MAX_CHARS = 2 * 1024 * 1024;  // older text is dropped from the page beyond this
+
+function appendLogText(pre, text) {
+    const container = pre.parentElement;
+    const atBottom = container.scrollHeight - container.scrollTop - container.clientHeight < 20;
+
+    pre.textContent += text;
+    if (pre.textContent.length > LOG_VIEW_MAX_CHARS) {
+        pre.textContent = pre.textContent.slice(-LOG_VIEW_MAX_CHARS);
+    }
+    if (atBottom) {
+        container.scrollTop = container.scrollHeight;
+    }
+}
+
+function applyLogChunk(pre, chunk) {
+    if (chunk.reset) {
+        pre.textContent = '';
+    }
+    if (chunk.skipped) {
+        appendLogText(pre, `\n[... ${chunk.skipped} bytes skipped ...]\n`);
+    }
+    appendLogText(pre, chunk.data);
+    pre.dataset.offset = chunk.next_offset;
+}
+
+function followLog(pre) {
+    const params = new URLSearchParams();
+    if (pre.dataset.offset) {
+        params.set('offset', pre.dataset.offset);
+    }
+    const source = new EventSource(`/api/logs/${pre.dataset.log}/stream?${params}`);
+
+    source.addEventListener('chunk', event => applyLogChunk(pre, JSON.parse(event.data)));
+    source.onerror = () => {
+        // Reconnect from the last received offset instead of the original URL
+        source.close();
+        setTimeout(() => followLog(pre), 3000);
+    };
+}
+
+async function loadLog(pre) {
+    try {
+        const response = await fetch(`/api/logs/${pre.dataset.log}`);
+        if (response.ok) {
+            applyLogChunk(pre, await response.json());
+        } else {
+            pre.textContent = `Log file not found: ${pre.dataset.path}\n`;
+        }
+    } catch (error) {
+        console.error('Error loading log:', error);
+    }
+    followLog(pre);
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('.log-content[data-log]').forEach(loadLog);
+});
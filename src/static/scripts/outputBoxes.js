@@ -1,7 +1,6 @@
 async function initApp() {
     try {
-        const response = await fetch('/api/config');
-        const config = await response.json();
+        const config = await fetchConfig();
         MODELS = config.models;
         META_PROMPTING_MODELS_ONLY = config.meta_models;
         
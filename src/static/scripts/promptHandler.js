@@ -1,63 +1,74 @@
 let customInput = false;
 
-// Function to handle sending prompt to backend for a specific model
-async function sendPromptToModel(prompt, model, systemPrompt = '') {
+// Reads a server-sent event stream from a fetch response and calls onEvent(name, payload)
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Server-sent events are separated by a blank line
+        let separator;
+        while ((separator = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, separator);
+            buffer = buffer.slice(separator + 2);
+
+            let eventName = 'message';
+            let eventData = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) eventName = line.slice(7);
+                else if (line.startsWith('data: ')) eventData += line.slice(6);
+            });
+            if (eventData) {
+                onEvent(eventName, JSON.parse(eventData));
+            }
+        }
+    }
+}
+
+// Runs the strategy pipelines of all boxes server-side in one request.
+// Each box is { outputModel, promptModel, strategy }; onToken(index, token) is called
+// for every chunk of a box's answer. Results are /insert_answer fields in the order of boxes.
+async function streamStrategyBatch(prompt, boxes, onToken) {
+    if (boxes.length === 0) return [];
+    const results = boxes.map(() => null);
     try {
-        const response = await fetch('/api/prompt', {
+        const response = await fetch('/api/strategy_stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ prompt: prompt, model: model, systemPrompt: systemPrompt})
+            body: JSON.stringify({ prompt: prompt, boxes: boxes })
         });
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
-        const data = await response.json();
-        
-        // Return both response and metadata
-        return {
-            response: data.response,
-            response_time: data.response_time,
-            tokens: data.tokens
-        };
-    } catch (error) {
-        console.error(`Error sending prompt to model ${model}:`, error);
-        return {
-            response: `Error: ${error.message}`,
-            response_time: 0,
-            tokens: { prompt_eval_count: 0, eval_count: 0, total_tokens: 0 }
-        };
-    }
-}
-
-// Dummy function for meta-prompting (to be expanded later)
-async function applyMetaPrompt(prompt, strategy, model) {
-    //console.log(`called with: ${prompt}, ${strategy}, ${model} }`);
 
-    let metaPromptArgs;
-
-    switch (strategy) {
-        case 'S-Template':
-            console.log(`@applyMetaPrompt : S-Template`);
-            metaPromptArgs = useBasicTemplate(prompt);
-            break;
-        case 'A-Template':
-            console.log(`@applyMetaPrompt : A-Template`);
-            metaPromptArgs = adaptBasicTemplate(prompt);
-            break;
-        case 'auto-PE':
-            console.log(`@applyMetaPrompt : auto-PE`);
-            metaPromptArgs = useAutoPE(prompt);
-            break;
-        case 'Rephrasing':
-            console.log(`@applyMetaPrompt : Rephrasing`);
-            metaPromptArgs = useRephrasing(prompt);
-            break;
+        await readEventStream(response, (eventName, payload) => {
+            if (eventName === 'token') {
+                onToken(payload.index, payload.token);
+            } else if (eventName === 'done') {
+                results[payload.index] = payload;
+            }
+        });
+    } catch (error) {
+        console.error('Error streaming strategy batch:', error);
     }
 
-    // Return the full response object
-    return await sendPromptToModel(metaPromptArgs.metaPrompt.trim(), model, metaPromptArgs.systemPrompt.trim());
+    return results.map((result, index) => result || {
+        answer: 'Error: stream ended unexpectedly',
+        model: boxes[index].outputModel,
+        strategy: boxes[index].strategy,
+        response_time: 0,
+        time_to_first_token: null,
+        cached: false,
+        tokens: { prompt_eval_count: 0, eval_count: 0, total_tokens: 0 },
+        metaprompt_data: null
+    });
 }
 
 
@@ -114,15 +125,11 @@ async function queryDistribution() {
             // Collect all responses before displaying anything
             const answersData = [];
             const responses = [];
+            const plans = [];
             
             for (const [index, box] of outputBoxes.entries()) {
-                let responseData;
                 let boxKey;
-                let appliedStrategyResult;
-                let outputModel = box.dataset.outputModel;
-                let referenceArgs;
-                let queryInSPARQL;
-
+                const outputModel = box.dataset.outputModel;
                 const promptModel = box.dataset.promptModel;
                 const strategy = box.dataset.strategy;
 
@@ -146,71 +153,40 @@ async function queryDistribution() {
                     tokens: { prompt_eval_count: 0, eval_count: 0, total_tokens: 0 }, // will be set later
                     metaprompt_data: null 
                 };
-                
-                if (box.dataset.strategy == 'none') { 
-                    // Raw output                    
-                    responseData = await sendPromptToModel(prompt, outputModel);
-                } else {
-                    let metaPromptText = '';
-                    let metaPromptTokens = { prompt_eval_count: 0, eval_count: 0, total_tokens: 0 };
 
-                    switch (strategy) {
-                        case 'L-Reference':
-                            console.log(`@queryDistribution : L-Reference`);
-                            referenceArgs = useLReferenceIN(prompt);
-                            const sparqlResponseData = await sendPromptToModel(referenceArgs.metaPrompt.trim(), promptModel, referenceArgs.systemPrompt.trim());
-                            queryInSPARQL = sparqlResponseData.response;
-                            queryDBpedia(queryInSPARQL);    // does not work atm (CORS error)
-                            responseData = { 
-                                response: queryInSPARQL,       // the SPARQL-query is the fallback answer, as long as the querying of dbpedia doesn't work
-                                response_time: sparqlResponseData.response_time,
-                                tokens: sparqlResponseData.tokens
-                            };
-                            metaPromptText = referenceArgs.metaPrompt.trim();
-                            metaPromptTokens = sparqlResponseData.tokens;
-                            
-                            //todo: translate answer from dbpedia to natural language
-                            //referenceArgs = useLReferenceOUT(queryDBpedia(queryInSPARQL));
-                            //responseData = await sendPromptToModel(referenceArgs.metaPrompt.trim(), outputModel, referenceArgs.systemPrompt.trim());
-                            break;
-                        case 'C-Reference':
-                            console.log(`@queryDistribution : C-Reference`);
-                            // at the beginning just like the 'none'-variant
-                            const initialResponseData = await sendPromptToModel(prompt, outputModel);
-                            // but with an additional proofread-layer extra
-                            referenceArgs = useCReference(prompt, initialResponseData.response);
-                            const proofreadResponseData = await sendPromptToModel(referenceArgs.metaPrompt.trim(), promptModel, referenceArgs.systemPrompt.trim());
-                            responseData = proofreadResponseData;
-                            metaPromptText = referenceArgs.metaPrompt.trim();
-                            metaPromptTokens = proofreadResponseData.tokens;
-                            break;
-                        default:
-                            console.log(`@queryDistribution : default-case promptHandler`);
-                            // regular Meta-prompted output           
-                            appliedStrategyResult = await applyMetaPrompt(prompt, strategy, promptModel);
-                            const finalResponseData = await sendPromptToModel(appliedStrategyResult.response, outputModel);
-                            responseData = finalResponseData;
-                            metaPromptText = appliedStrategyResult.response;
-                            metaPromptTokens = appliedStrategyResult.tokens;
-                    }
-           
-                    // Set metaprompt data for strategies other than 'none'
-                    answerData.metaprompt_data = {
-                        strategy_name: strategy,
-                        metaPrompt: metaPromptText,
-                        prompt_model: promptModel,
-                        tokens: metaPromptTokens
-                    };
+                plans.push({ box, answerData, strategy, outputModel, promptModel, streamed: '' });
+            }
+
+            // All strategy stages run on the server; the final answers are streamed into the boxes
+            const results = await streamStrategyBatch(prompt, plans.map(plan => ({
+                outputModel: plan.outputModel,
+                promptModel: plan.promptModel,
+                strategy: plan.strategy
+            })), (index, token) => {
+                const plan = plans[index];
+                plan.streamed += token;
+                plan.box.innerHTML = parseMarkdown(plan.streamed);
+            });
+
+            results.forEach((result, index) => {
+                const answerData = plans[index].answerData;
+
+                if (result.strategy === 'L-Reference') {
+                    // the SPARQL-query is the fallback answer, as long as the querying of dbpedia doesn't work
+                    queryDBpedia(result.answer);    // does not work atm (CORS error)
                 }
-                
-                // Set the actual response and metadata
-                answerData.answer = responseData.response;
-                answerData.response_time = responseData.response_time;
-                answerData.tokens = responseData.tokens;
-                
-                responses.push(responseData.response);
+
+                // Set the actual response, metadata and the metaprompt for strategies other than 'none'
+                answerData.answer = result.answer;
+                answerData.response_time = result.response_time;
+                answerData.time_to_first_token = result.time_to_first_token ?? null;
+                answerData.cached = result.cached || false;
+                answerData.tokens = result.tokens;
+                answerData.metaprompt_data = result.metaprompt_data;
+
+                responses.push(result.answer);
                 answersData.push(answerData);
-            }
+            });
             
             const insertQueryData = {
                 user: currentUser,
@@ -278,6 +254,8 @@ async function queryDistribution() {
 
             incrementUserQuestionCount(prompt);
             populateDropdown();
+            // Pick up the server's counts, including other users' queries
+            syncQuestionCounters().then(changed => changed && populateDropdown());
             showResults(responses, outputBoxes);
         } catch (error) {
             console.error('Error processing models:', error);
@@ -1,10 +1,86 @@
+// Escapes text for use in HTML (the template engine did this before rows were loaded via JS)
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text ?? '';
+    return div.innerHTML;
+}
+
+// Formats 'YYYY-MM-DD HH:MM:SS' as time on top of DD-MM-YY
+function formatTimestamp(timestamp) {
+    const [datePart, timePart] = (timestamp || '').split(' ');
+    const dateComponents = (datePart || '').split('-');
+    if (!timePart || dateComponents.length !== 3) return timestamp || '';
+    return `<span class="time">${timePart}</span><br>
+            <span class="date">${dateComponents[2]}-${dateComponents[1]}-${dateComponents[0].slice(2)}</span>`;
+}
+
+function createQueryRow(row) {
+    return `
+        <tr data-query-id="${row.QueryID}">
+            <td class="table-id">${escapeHtml(row.UserQueryID)}</td>
+            <td class="table-timestamp col-timestamp-data">${formatTimestamp(row.Timestamp)}</td>
+            <td class="col-question-data">
+                <div class="question-text">${escapeHtml(row.Question)}</div>
+            </td>
+            <td class="col-answers-data">
+                <span class="table-badge ${row.AnswerCount > 0 ? 'has-answers' : 'no-answers'}">
+                    ${row.AnswerCount}
+                </span>
+            </td>
+        </tr>
+    `;
+}
+
 document.addEventListener('DOMContentLoaded', function() {
     const tableContainer = document.querySelector('.table-container');
-    const tableRows = document.querySelectorAll('.queries-table tbody tr');
+    const queriesTable = document.querySelector('.queries-table');
+    const queriesBody = document.querySelector('.queries-table tbody');
+    const loadMoreBtn = document.querySelector('.load-more-btn');
+    const userFilter = document.querySelector('.query-filter-user');
+    const questionFilter = document.querySelector('.query-filter-question');
+    let nextCursor = null;
+
+    // Load one page of queries from the server (reset starts from the first page)
+    async function loadQueries(reset = false) {
+        if (!queriesBody) return;
+        if (reset) nextCursor = null;
+
+        const params = new URLSearchParams({ limit: queriesTable.dataset.pageSize || 50 });
+        if (nextCursor) params.set('cursor', nextCursor);
+        if (userFilter && userFilter.value.trim()) params.set('user', userFilter.value.trim());
+        if (questionFilter && questionFilter.value) params.set('question_id', questionFilter.value);
+
+        try {
+            const response = await fetch(`/api/queries?${params}`);
+            const result = await response.json();
+            if (result.error) {
+                console.error('Error fetching queries:', result.error);
+                return;
+            }
+
+            const rowsHTML = result.rows.map(createQueryRow).join('');
+            if (reset) queriesBody.innerHTML = rowsHTML;
+            else queriesBody.insertAdjacentHTML('beforeend', rowsHTML);
+
+            nextCursor = result.next_cursor;
+            loadMoreBtn.style.display = nextCursor ? '' : 'none';
+        } catch (error) {
+            console.error('Error:', error);
+        }
+    }
+
+    if (loadMoreBtn) loadMoreBtn.addEventListener('click', () => loadQueries());
+    let filterTimeout;
+    if (userFilter) userFilter.addEventListener('input', () => {
+        clearTimeout(filterTimeout);
+        filterTimeout = setTimeout(() => loadQueries(true), 300);
+    });
+    if (questionFilter) questionFilter.addEventListener('change', () => loadQueries(true));
+    loadQueries(true);
       
     // Handle SQL query execution
     const sqlQueryBtn = document.querySelector('.sql-query-btn');
-    const sqlQueryInput = document.querySelector('.sql-query-input');
+    const sqlQueryInput = document.querySelector('textarea.sql-query-input');
     
     if (sqlQueryBtn && sqlQueryInput) {
         // Automatic height adjustment for the textarea
@@ -65,7 +141,7 @@ document.addEventListener('DOMContentLoaded', function() {
             }
             
             // Create and display custom table
-            const customTableHTML = createCustomTable(result.columns, result.rows);
+            const customTableHTML = createCustomTable(result.columns, result.rows, result.truncated);
             tableContainer.insertAdjacentHTML('beforeend', customTableHTML);
             
         } catch (error) {
@@ -74,7 +150,7 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
-    function createCustomTable(columns, rows) {
+    function createCustomTable(columns, rows, truncated = null) {
         let headerHTML = '';
         columns.forEach(col => {
             headerHTML += `<th>${col}</th>`;
@@ -93,7 +169,7 @@ document.addEventListener('DOMContentLoaded', function() {
         
         return `
             <div class="custom-table-container">
-                <h3>Custom Query Results (${rows.length} rows)</h3>
+                <h3>Custom Query Results (${rows.length} rows${truncated ? `, truncated: ${truncated}` : ''})</h3>
                 <div class="table-scroll-wrapper">
                     <table class="table custom-table">
                         <thead>
@@ -110,58 +186,62 @@ document.addEventListener('DOMContentLoaded', function() {
         `;
     }
     
-    tableRows.forEach(row => {
-        row.addEventListener('click', async function() {
-            // Remove previous selection
-            document.querySelectorAll('.queries-table tbody tr.selected').forEach(r => {
-                r.classList.remove('selected');
-            });
-            
-            // Add selection to clicked row
-            this.classList.add('selected');
-            
-            const queryId = this.dataset.queryId;
+    // Rows are loaded page by page, so clicks are delegated to the table body
+    if (queriesBody) queriesBody.addEventListener('click', function(e) {
+        const row = e.target.closest('tr');
+        if (row) showQueryAnswers(row);
+    });
+
+    async function showQueryAnswers(row) {
+        // Remove previous selection
+        document.querySelectorAll('.queries-table tbody tr.selected').forEach(r => {
+            r.classList.remove('selected');
+        });
+        
+        // Add selection to clicked row
+        row.classList.add('selected');
+        
+        const queryId = row.dataset.queryId;
+        
+        // Remove any existing tables
+        const existingAnswerTable = document.querySelector('.answers-table-container');
+        if (existingAnswerTable) {
+            existingAnswerTable.remove();
+        }
+        
+        const existingCustomTable = document.querySelector('.custom-table-container');
+        if (existingCustomTable) {
+            existingCustomTable.remove();
+        }
+        
+        try {
+            // Fetch answers for this query
+            const response = await fetch(`/api/query_answers/${queryId}`);
+            const answers = await response.json();
             
-            // Remove any existing tables
-            const existingAnswerTable = document.querySelector('.answers-table-container');
-            if (existingAnswerTable) {
-                existingAnswerTable.remove();
+            if (answers.error) {
+                console.error('Error fetching answers:', answers.error);
+                return;
             }
             
-            const existingCustomTable = document.querySelector('.custom-table-container');
-            if (existingCustomTable) {
-                existingCustomTable.remove();
-            }
+            // Create and append the answers table
+            const answersTableHTML = createAnswersTable(answers);
+            tableContainer.insertAdjacentHTML('beforeend', answersTableHTML);
             
-            try {
-                // Fetch answers for this query
-                const response = await fetch(`/api/query_answers/${queryId}`);
-                const answers = await response.json();
-                
-                if (answers.error) {
-                    console.error('Error fetching answers:', answers.error);
-                    return;
-                }
-                
-                // Create and append the answers table
-                const answersTableHTML = createAnswersTable(answers);
-                tableContainer.insertAdjacentHTML('beforeend', answersTableHTML);
-                
-                // Add event listeners for the new table
-                setupAnswersTableEvents();
-                
-            } catch (error) {
-                console.error('Error:', error);
-            }
-        });
-    });
+            // Add event listeners for the new table
+            setupAnswersTableEvents();
+            
+        } catch (error) {
+            console.error('Error:', error);
+        }
+    }
     
     // Initialize search functionality
     const searchInput = document.querySelector('.table-search');
     if (searchInput) {
         searchInput.addEventListener('input', function() {
             const searchTerm = this.value.toLowerCase();
-            tableRows.forEach(row => {
+            document.querySelectorAll('.queries-table tbody tr').forEach(row => {
                 const text = row.textContent.toLowerCase();
                 if (text.includes(searchTerm)) {
                     row.style.display = '';
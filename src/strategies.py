@@ -0,0 +1,243 @@
+"""
+Meta-prompting strategies.
+Every strategy turns a question into the prompts of its pipeline; run_strategy
+executes the pipeline with a generate callable and returns the answer in the
+format expected by /insert_answer.
+"""
+import threading
+from concurrent.futures import Future
+
+NO_STRATEGY = 'none'
+
+
+# based on https://arxiv.org/pdf/2311.11482
+def basic_template(prompt):
+    return f"""
+        Task: Prompt Revision to Enhance Reasoning Capabilities.
+            1. Original Question: Let's think step by step. {prompt}
+            2. Goal: Transform the original prompt into a enhanced version while preserving its core objectives.
+            3. Transformation Instructions:
+                (a) Retain the primary purpose and objectives.
+                (b) Introduce scenarios that challenge conventional thinking, if necessary.
+                (c) Provide a few-shot setting with examples, if necessary.
+                (d) Decompose the problem into manageable components, if necessary.
+                (e) Use clear, direct language, and structure the prompt with bullet points or numbered steps for clarity.
+            4. Outcome: The revised prompt should be sufficiently detailed to guide effective task completion.
+        """
+
+
+# based on https://arxiv.org/pdf/2311.11482
+def basic_system_prompt():
+    return """
+        You are a specialized prompt engineer with extensive expertise in effective communication. Your task is to revise input prompts to ensure they:
+            1. Activate deeper cognitive processes.
+            2. Uncover potential reasoning errors.
+            3. Clearly interpret and understand the presented question.
+        Work methodically and always preserve the prompt's structure as a question under any circumstances.
+        """
+
+
+def use_basic_template(prompt):
+    return basic_template(prompt), basic_system_prompt()
+
+
+def adapt_basic_template(prompt):
+    return basic_template(prompt), """
+        You are a specialized prompt engineer with extensive expertise in meta prompting templates. Your task is to methodically improve a given template and ensure that:
+            (a) Adapt the core objectives 2. to 4. to the domain of the original question.
+            (b) Keep the core objectives 2. to 4. logical and coherent.
+            (c) Keep the original question unchanged under any circumstances.
+        The expected output is an improved version of the initial template.
+        """
+
+
+# based on https://cobusgreyling.medium.com/meta-prompting-a-practical-guide-to-optimising-prompts-automatically-c0a071f4b664
+def use_auto_pe(prompt):
+    return f"""
+        Improve the following question to generate a more reliable answer.
+        Adhere to prompt engineering best practices in order to improve the question.
+        Make sure the structure is clear and intuitive.
+
+        Original question: {prompt}
+
+        Only return the improved question.""", basic_system_prompt()
+
+
+def use_rephrasing(prompt):
+    return f"""
+        Original question: {prompt}
+        Your main objectives are:
+            1. Implicit requirements hidden in the question have to be made explicit.
+            2. Logical contradictions contained in the question have to be phrased as uncertainties.
+            3. The Vocabulary has to fit the domain of the question.
+        Work methodically and always preserve the prompt's structure as a question under any circumstances. Only return the rephrased question.
+        """, """
+        You are a specialized prompt engineer with extensive expertise in effective communication. You are able to rephrase even the most challanging questions into accessable and understandable queries.
+        """
+
+
+# few-shot prompting with an example from "Einführung in die Wissensrepräsentation" by Prof. Dr. Fabian Neuhaus
+def use_l_reference_in(prompt):
+    return f"""
+        # Example question: What films were directed by David Lynch or George Lucas?
+        # SPARQL query:
+            PREFIX dbo: <http://dbpedia.org/ontology/>
+            PREFIX dbp: <http://dbpedia.org/property/>
+
+            SELECT ?titelEN WHERE {{
+
+                {{ _:1 a dbo:Film;
+                rdfs:label ?titelEN;
+                dbo:director dbr:David Lynch. }}
+
+                UNION
+
+                {{ _:1 a dbo:Film;
+                rdfs:label ?titelEN;
+                dbo:director dbr:George Lucas. }}
+                filter langMatches( lang(?titelEN), ”EN” )
+
+            }}
+
+        # Real question: {prompt}
+        # SPARQL query: <todo>
+
+        Only return the SPARQL query related to the real question.
+    """, """
+        You are a specialized prompt engineer with extensive expertise in SPARQL. Your task is to create queries corresponding to user questions.
+        """
+
+
+def use_c_reference(prompt, output_result):
+    return f"""
+        # Challanging question:
+        {prompt}
+
+        # Proposed answer:
+        {output_result}
+
+        # Improved answer:
+        <todo>
+        """, """
+        You are an expert proofreader for potential answer candidates for challanging questions. Your role is to rigorously assess question-answer pairs and improve the proposed answers. Your main objectives are:
+            1. Assure factual accuracy, logical consistency, completeness, and absence of errors.
+            2. Assure conciseness, absence of fluff, and strict adherence to the question's scope.
+            3. You are only allowed to output the improved answer.
+        """
+
+
+# Strategies whose meta-prompt is generated by the prompt model and then answered by the output model
+TEMPLATE_STRATEGIES = {
+    'S-Template': use_basic_template,
+    'A-Template': adapt_basic_template,
+    'auto-PE': use_auto_pe,
+    'Rephrasing': use_rephrasing,
+}
+
+STRATEGY_NAMES = [NO_STRATEGY, *TEMPLATE_STRATEGIES, 'L-Reference', 'C-Reference']
+
+
+def shared_metaprompt_keys(boxes):
+    """
+    Meta-prompt generations shared by several boxes of one prompt.
+    Template strategies generate the same meta-prompt for every output model,
+    so boxes with the same (strategy, prompt model) need it only once.
+
+    Args:
+        boxes: List of (strategy, prompt_model) pairs
+
+    Returns:
+        set: (strategy, prompt_model) pairs used by more than one box
+    """
+    counts = {}
+    for strategy, prompt_model in boxes:
+        if strategy in TEMPLATE_STRATEGIES:
+            counts[(strategy, prompt_model)] = counts.get((strategy, prompt_model), 0) + 1
+    return {key for key, count in counts.items() if count > 1}
+
+
+class SharedGenerations:
+    """Runs every distinct generation once; concurrent callers wait for its result"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures = {}  # key -> Future
+
+    def run(self, key, generate):
+        """
+        Result of generate() for key, computed by the first caller only.
+
+        Args:
+            key: Hashable description of the generation, e.g. (prompt, model, system_prompt)
+            generate: Callable without arguments that produces the result
+        """
+        with self._lock:
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = self._futures[key] = Future()
+        if owner:
+            try:
+                future.set_result(generate())
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+
+def run_strategy(strategy, prompt, output_model, prompt_model, generate):
+    """
+    Run the pipeline of a strategy for one output box.
+
+    Args:
+        strategy: Name from STRATEGY_NAMES
+        prompt: The question
+        output_model: Model that produces the answer
+        prompt_model: Model that produces the meta-prompt (unused for 'none')
+        generate: Callable (prompt, model, system_prompt, final) returning
+            the /api/prompt body (response, response_time, tokens, ...);
+            final is True for the generation that produces the answer
+
+    Returns:
+        dict: Answer fields for /insert_answer (without user, query_id, position)
+    """
+    metaprompt = None
+
+    if strategy == NO_STRATEGY:
+        result = generate(prompt, output_model, '', True)
+
+    elif strategy == 'L-Reference':
+        meta_prompt, system_prompt = use_l_reference_in(prompt)
+        result = generate(meta_prompt.strip(), prompt_model, system_prompt.strip(), True)
+        # The SPARQL query is the answer as long as DBpedia can't be queried
+        metaprompt = (meta_prompt.strip(), result['tokens'])
+
+    elif strategy == 'C-Reference':
+        baseline = generate(prompt, output_model, '', False)
+        meta_prompt, system_prompt = use_c_reference(prompt, baseline['response'])
+        result = generate(meta_prompt.strip(), prompt_model, system_prompt.strip(), True)
+        metaprompt = (meta_prompt.strip(), result['tokens'])
+
+    elif strategy in TEMPLATE_STRATEGIES:
+        meta_prompt, system_prompt = TEMPLATE_STRATEGIES[strategy](prompt)
+        improved = generate(meta_prompt.strip(), prompt_model, system_prompt.strip(), False)
+        result = generate(improved['response'], output_model, '', True)
+        metaprompt = (improved['response'], improved['tokens'])
+
+    else:
+        raise ValueError(f"Unknown strategy: {strategy}")
+
+    return {
+        'answer': result['response'],
+        'model': output_model,
+        'strategy': strategy,
+        'response_time': result['response_time'],
+        'time_to_first_token': result.get('time_to_first_token'),
+        'cached': result.get('cached', False),
+        'tokens': result['tokens'],
+        'metaprompt_data': None if metaprompt is None else {
+            'strategy_name': strategy,
+            'metaPrompt': metaprompt[0],
+            'prompt_model': prompt_model,
+            'tokens': metaprompt[1]
+        }
+    }
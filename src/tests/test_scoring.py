@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+bert_score = pytest.importorskip("bert_score")
+
+from scoring import ReferenceEmbeddingStore, ScoringQueue, ScoringService
+
+VOCAB = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]",
+         "the", "sky", "is", "blue", "grass", "green", "water", "wet"]
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    """A randomly initialized two-layer BERT saved locally, so no download is needed"""
+    path = tmp_path_factory.mktemp("tiny-bert")
+    vocab_file = path / "vocab.txt"
+    vocab_file.write_text("\n".join(VOCAB) + "\n")
+    transformers.BertTokenizer(str(vocab_file), model_max_length=512).save_pretrained(str(path))
+    torch.manual_seed(0)
+    config = transformers.BertConfig(vocab_size=len(VOCAB), hidden_size=16, num_hidden_layers=2,
+                                     num_attention_heads=2, intermediate_size=32)
+    transformers.BertModel(config).save_pretrained(str(path))
+    return str(path)
+
+
+@pytest.fixture
+def service(tiny_model, tmp_path):
+    service = ScoringService(reference_store=ReferenceEmbeddingStore(tmp_path / "references"))
+    service._scorer = bert_score.BERTScorer(model_type=tiny_model, num_layers=2, idf=False)
+    return service
+
+
+def test_encode_without_idf_dict(service):
+    assert service._scorer._idf_dict is None
+
+    (embedding, idf), = service._encode(["the sky is blue"])
+
+    # [CLS] and [SEP] get weight 0, every other token weight 1
+    assert embedding.shape[0] == idf.shape[0] == 6
+    assert idf.tolist() == [0, 1, 1, 1, 1, 0]
+
+
+def test_stored_references_match_bert_scorer(service):
+    answers = ["the sky is blue", "grass is green"]
+    references = ["the sky is blue", "water is wet"]
+
+    assert service.precompute_references(references) == 2
+    stored = service._score_against_stored(answers, references)
+    P, R, F = service._scorer.score(answers, references, verbose=False)
+
+    for (p, r, f), expected in zip(stored, zip(P.tolist(), R.tolist(), F.tolist())):
+        assert (p, r, f) == pytest.approx(expected, abs=1e-5)
+
+
+class FlakyQueue(ScoringQueue):
+    """Fails every batch that contains a "bad" answer"""
+
+    def __init__(self, **kwargs):
+        super().__init__(scorer=None, session_factory=None, **kwargs)
+        self.scored = []
+
+    def _process(self, batch):
+        if any(answer == "bad" for _, _, answer, _ in batch):
+            raise RuntimeError("cannot score")
+        self.scored.extend(answer_id for answer_id, _, _, _ in batch)
+
+
+def test_failed_batch_is_retried_per_answer():
+    scoring_queue = FlakyQueue(max_batch_size=4, max_wait=0.05, max_retries=2)
+    for answer_id, answer in enumerate(["good", "bad", "also good"]):
+        scoring_queue.submit(answer_id, 7, answer, "reference")
+    scoring_queue.start()
+
+    deadline = time.monotonic() + 5
+    while scoring_queue.pending() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    scoring_queue.shutdown()
+
+    assert sorted(scoring_queue.scored) == [0, 2]
+    assert scoring_queue.pending() == 0
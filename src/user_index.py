@@ -0,0 +1,113 @@
+"""
+In-memory autocompletion index for user names.
+Prefix matches come from a sorted array (binary search), infix matches from
+a trigram index, so suggestions don't scan the users table per keystroke.
+Texts shorter than a trigram fall back to a bounded scan of the names.
+"""
+import bisect
+import threading
+
+from db_models import User
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class UserIndex:
+    """Sorted prefix array plus trigram index over all user names"""
+
+    def __init__(self, session_factory):
+        """
+        Args:
+            session_factory: Callable returning a SQLAlchemy session
+        """
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._sorted = None   # [(lowercase name, name)], sorted
+        self._trigrams = {}   # trigram -> set of names
+
+    def load(self):
+        """(Re)build the index from the users table"""
+        session = self.session_factory()
+        try:
+            names = [row[0] for row in session.query(User.user)]
+        finally:
+            session.close()
+
+        entries = sorted((name.lower(), name) for name in names)
+        trigrams = {}
+        for key, name in entries:
+            for trigram in _trigrams(key):
+                trigrams.setdefault(trigram, set()).add(name)
+        with self._lock:
+            self._sorted = entries
+            self._trigrams = trigrams
+
+    def add(self, name):
+        """Add a new user name to the index"""
+        if self._sorted is None:
+            self.load()
+            return
+        key = name.lower()
+        with self._lock:
+            i = bisect.bisect_left(self._sorted, (key, name))
+            if i < len(self._sorted) and self._sorted[i] == (key, name):
+                return
+            self._sorted.insert(i, (key, name))
+            for trigram in _trigrams(key):
+                self._trigrams.setdefault(trigram, set()).add(name)
+
+    def search(self, text, limit=10):
+        """
+        Ranked suggestions for the typed text: exact match, then prefix
+        matches (shortest first), then names containing the text.
+
+        Returns:
+            list: Up to `limit` user names
+        """
+        if self._sorted is None:
+            self.load()
+        key = text.strip().lower()
+
+        with self._lock:
+            i = bisect.bisect_left(self._sorted, (key, ''))
+            prefix = []
+            # Only the first matches are ranked, so the scan stays bounded
+            while i < len(self._sorted) and self._sorted[i][0].startswith(key) and len(prefix) < limit * 4:
+                prefix.append(self._sorted[i])
+                i += 1
+            if not key:
+                return [name for _, name in prefix[:limit]]
+
+            infix = []
+            if len(prefix) < limit and len(key) >= 3:
+                candidates = None
+                for trigram in _trigrams(key):
+                    names = self._trigrams.get(trigram, set())
+                    candidates = names if candidates is None else candidates & names
+                    if not candidates:
+                        break
+                infix = [(name.lower(), name) for name in candidates or ()]
+            elif len(prefix) < limit:
+                # Too short for trigrams: scan the names, stopping once the page is full
+                for lower, name in self._sorted:
+                    if key in lower and not lower.startswith(key):
+                        infix.append((lower, name))
+                        if len(prefix) + len(infix) >= limit:
+                            break
+
+        prefix.sort(key=lambda entry: (entry[0] != key, len(entry[0]), entry[0]))
+        results = [name for _, name in prefix]
+        seen = set(results)
+        # Trigram candidates still have to contain the text as a whole
+        infix = sorted(
+            (lower.find(key), len(lower), lower, name)
+            for lower, name in infix
+            if name not in seen and key in lower
+        )
+        results.extend(name for *_, name in infix)
+        return results[:limit]
+
+    def __len__(self):
+        return len(self._sorted or ())